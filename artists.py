@@ -0,0 +1,185 @@
+from operator import itemgetter
+
+from flask import (
+    Blueprint,
+    current_app,
+    flash,
+    redirect,
+    render_template,
+    request,
+    url_for
+)
+
+from cache import response_cache
+from conditional import conditional
+from forms import ArtistForm
+from instrumentation import query_budget
+from models import (
+    PROFILE_SHOWS_CURSOR,
+    db,
+    Artist,
+    profile_shows,
+    profile_state,
+    search
+)
+from pagination import decode_cursor, keyset_paginate, more_cursor, page_args
+from routing import read_only
+
+bp = Blueprint('artists', __name__)
+
+
+@bp.route('/artists')
+@query_budget(1)
+@response_cache.cached(Artist)
+def artists():
+    after, before, per_page = page_args()
+    page = keyset_paginate(
+        db.session.query(Artist.id, Artist.name),
+        [Artist.name, Artist.id],
+        key=lambda row: (row.name, row.id),
+        after=after, before=before, per_page=per_page)
+    data = [{'id': row.id, 'name': row.name} for row in page.items]
+    return render_template('pages/artists.html', artists=data, page=page)
+
+
+@bp.route('/artists/search', methods=['POST'])
+@query_budget(1)
+@read_only
+def search_artists():
+    search_term = request.form.get('search_term', '')
+    results = search(Artist, search_term, current_app.config['SEARCH_LIMIT'])
+    response = {
+        'count': results[0].total if results else 0,
+        'data': [{
+            'id': artist.id,
+            'name': artist.name,
+            'num_upcoming_shows': artist.upcoming_shows_count
+        } for artist, _ in results]
+    }
+    return render_template(
+        'pages/search_artists.html',
+        results=response,
+        search_term=search_term)
+
+
+@bp.route('/artists/<int:artist_id>')
+@query_budget(3)
+@conditional(lambda artist_id: profile_state(Artist, artist_id))
+def show_artist(artist_id):
+    data = Artist.query.get_or_404(artist_id).format()
+    shows = profile_shows(
+        Artist, artist_id, current_app.config['PROFILE_SHOWS_LIMIT'])
+    data['upcoming_shows'], data['upcoming_shows_count'] = shows['upcoming']
+    data['past_shows'], data['past_shows_count'] = shows['past']
+    data['past_shows_cursor'] = more_cursor(
+        *shows['past'], key=itemgetter('start_time', 'id'))
+    return render_template('pages/show_artist.html', artist=data)
+
+
+@bp.route('/artists/<int:artist_id>/past-shows')
+@query_budget(3)
+@conditional(lambda artist_id: profile_state(Artist, artist_id))
+def artist_past_shows(artist_id):
+    # "Load more" for the profile page: the next past shows, older than
+    # the ?before= cursor.
+    artist = Artist.query.get_or_404(artist_id)
+    before = request.args.get('before')
+    shows, remaining = profile_shows(
+        Artist, artist_id, current_app.config['PROFILE_SHOWS_LIMIT'],
+        before=decode_cursor(before, PROFILE_SHOWS_CURSOR)
+        if before else None)['past']
+    cursor = more_cursor(
+        shows, remaining, key=itemgetter('start_time', 'id'))
+    return render_template(
+        'pages/past_shows.html', name=artist.name,
+        profile_url=url_for('artists.show_artist', artist_id=artist_id),
+        shows=shows, other='venue',
+        more_url=cursor and url_for(
+            'artists.artist_past_shows', artist_id=artist_id,
+            before=cursor))
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@query_budget(1)
+def edit_artist(artist_id):
+    form = ArtistForm()
+    artist = Artist.query.filter(Artist.id == artist_id).one_or_none().format()
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    artist = Artist.query.filter(Artist.id == artist_id).one_or_none()
+    form = ArtistForm(request.form, meta={'csrf': False})
+    if form.validate():
+        try:
+            artist.name = form.name.data
+            artist.city = form.city.data
+            artist.state = form.state.data
+            artist.phone = form.phone.data
+            artist.image_link = form.image_link.data
+            artist.facebook_link = form.facebook_link.data
+            artist.genres = form.genres.data
+            artist.website = form.website_link.data
+            artist.seeking_venue = form.seeking_venue.data
+            artist.seeking_description = form.seeking_description.data
+            db.session.add(artist)
+            db.session.commit()
+        except ValueError as e:
+            print(e)
+            db.session.rollback()
+        finally:
+            db.session.close()
+        flash('Artist ' + request.form['name'] +
+                  ' was successfully updated!')
+        return redirect(url_for('artists.show_artist', artist_id=artist_id))
+    else:
+        message = []
+        for field, errors in form.errors.items():
+            for error in errors:
+                message.append(f"{field}: {error}")
+        flash('Please fix the following errors: ' + ", ".join(message))
+        form = ArtistForm()
+        return render_template('forms/edit_artist.html', form=form, artist=artist)
+    
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    form = ArtistForm(request.form, meta={'csrf': False})
+    if form.validate():
+        try:
+            artist = Artist(
+                name = form.name.data,
+                city = form.city.data,
+                state = form.state.data,
+                phone = form.phone.data,
+                image_link = form.image_link.data,
+                facebook_link = form.facebook_link.data,
+                genres = form.genres.data,
+                website = form.website_link.data,
+                seeking_venue = form.seeking_venue.data,
+                seeking_description = form.seeking_description.data
+            )
+            db.session.add(artist)
+            db.session.commit()
+        except ValueError as e:
+            print(e)
+            db.session.rollback()
+        finally:
+            db.session.close()
+        flash('Artist ' + request.form['name'] +
+                  ' was successfully listed!') 
+        return render_template('pages/home.html')
+    else:
+        message = []
+        for field, errors in form.errors.items():
+            for error in errors:
+                message.append(f"{field}: {error}")
+        flash('Please fix the following errors: ' + ", ".join(message))
+        form = ArtistForm()
+        return render_template('forms/new_artist.html', form=form)
@@ -0,0 +1,184 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import current_app, request, send_from_directory, url_for
+
+# ----------------------------------------------------------------------------#
+# Static asset bundles.
+# ----------------------------------------------------------------------------#
+
+# `flask build-assets` concatenates and minifies each bundle below into
+# static/dist/<name>.<content hash>.<ext>, next to .gz and (with the
+# optional ``brotli`` package) .br copies, and records the file names in
+# static/dist/manifest.json. Since a file name changes whenever its
+# content does, the files are served with far-future immutable cache
+# headers. Templates link to bundles with asset_urls(name), which gives
+# the source files instead while ASSETS_DEBUG is on or nothing is built.
+
+BUNDLES = {
+    'main.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # Deferred, so it runs after the jQuery loaded at the end of the page.
+    'main.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+ONE_YEAR = 365 * 24 * 60 * 60
+
+_CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(css):
+    try:
+        import rcssmin
+    except ImportError:
+        css = _CSS_COMMENT.sub('', css)
+        css = _CSS_SPACE.sub(' ', css)
+        css = _CSS_PUNCTUATION.sub(r'\1', css)
+        return css.replace(';}', '}').strip()
+    return rcssmin.cssmin(css)
+
+
+def minify_js(js):
+    # Without rjsmin the scripts are only concatenated; the large ones
+    # already ship minified.
+    try:
+        import rjsmin
+    except ImportError:
+        return js.strip()
+    return rjsmin.jsmin(js)
+
+
+def _rebase_urls(css, source, static_folder):
+    # Keep relative url()s pointing at the same file once the stylesheet
+    # lives in static/dist.
+    source_dir = os.path.dirname(os.path.join(static_folder, source))
+    dist_dir = os.path.join(static_folder, DIST)
+
+    def rebase(match):
+        url = match.group(2)
+        if re.match(r'^(?:[a-z]+:|/|#)', url):
+            return match.group(0)
+        path, _, suffix = url.partition('?')
+        path, hash_sign, fragment = path.partition('#')
+        rebased = os.path.relpath(
+            os.path.normpath(os.path.join(source_dir, path)), dist_dir)
+        rebased = rebased.replace(os.sep, '/') + hash_sign + fragment
+        return 'url("{}{}")'.format(rebased, '?' + suffix if suffix else '')
+
+    return _CSS_URL.sub(rebase, css)
+
+
+def _bundle(name, sources, static_folder):
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source),
+                  encoding='utf-8') as f:
+            content = f.read()
+        if name.endswith('.css'):
+            parts.append(minify_css(
+                _rebase_urls(content, source, static_folder)))
+        else:
+            parts.append(minify_js(content))
+    separator = '\n' if name.endswith('.css') else ';\n'
+    return (separator.join(parts) + '\n').encode('utf-8')
+
+
+def _write_compressed(path, content):
+    with open(path + '.gz', 'wb') as f:
+        # mtime=0 keeps the output identical from one build to the next.
+        with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=9,
+                           mtime=0) as compressed:
+            compressed.write(content)
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(content, quality=11))
+
+
+def build(static_folder):
+    """Write every bundle to static/dist; return the new manifest."""
+    dist_dir = os.path.join(static_folder, DIST)
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        content = _bundle(name, sources, static_folder)
+        stem, ext = os.path.splitext(name)
+        filename = '{}.{}{}'.format(
+            stem, hashlib.sha256(content).hexdigest()[:12], ext)
+        path = os.path.join(dist_dir, filename)
+        with open(path, 'wb') as f:
+            f.write(content)
+        _write_compressed(path, content)
+        manifest[name] = filename
+    with open(os.path.join(dist_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_urls(name):
+    """URLs to link for bundle ``name``, in order."""
+    app = current_app._get_current_object()
+    manifest = app.extensions['assets']
+    if not app.config['ASSETS_DEBUG'] and name in manifest:
+        return [url_for('assets', filename=manifest[name])]
+    return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+
+def send_asset(filename):
+    directory = os.path.join(current_app.static_folder, DIST)
+    mimetype = mimetypes.guess_type(filename)[0]
+    encoding = None
+    for suffix, candidate in (('.br', 'br'), ('.gz', 'gzip')):
+        if candidate in request.accept_encodings and \
+                os.path.exists(os.path.join(directory, filename + suffix)):
+            filename += suffix
+            encoding = candidate
+            break
+    response = send_from_directory(directory, filename, mimetype=mimetype,
+                                   cache_timeout=ONE_YEAR)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('ASSETS_DEBUG', app.debug)
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.add_url_rule(app.static_url_path + '/' + DIST + '/<path:filename>',
+                     'assets', send_asset)
+    app.jinja_env.globals['asset_urls'] = asset_urls
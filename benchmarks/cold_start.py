@@ -0,0 +1,123 @@
+"""Cold-start time: from a fresh interpreter to the first responses.
+
+Every sample runs in a new Python process. The process imports the app,
+calls create_app(), then requests a few template-heavy pages that need no
+database. It reports, in ms, the time spent importing, creating the app,
+serving the first page and serving every page, and the total from start
+to the last response.
+
+Each mode is measured separately:
+
+    compile   templates compiled on first use, no bytecode cache
+    bytecode  templates loaded from a bytecode cache filled beforehand
+              (what `flask precompile-templates` does at deploy)
+    preload   bytecode cache plus TEMPLATES_PRELOAD; create_app() loads
+              every template, as the gunicorn master does before forking
+
+Run from the repository root:
+
+    python -m benchmarks.cold_start --samples 10
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PAGES = ['/', '/venues/create', '/artists/create', '/missing']
+
+MODES = {
+    'compile': {'cache': False, 'preload': False},
+    'bytecode': {'cache': True, 'preload': False},
+    'preload': {'cache': True, 'preload': True},
+}
+
+
+def child():
+    started = time.perf_counter()
+    import config
+    from app import create_app
+    imported = time.perf_counter()
+
+    config.TEMPLATE_CACHE_DIR = os.environ['BENCH_TEMPLATE_CACHE_DIR'] or None
+    config.TEMPLATES_PRELOAD = os.environ['BENCH_TEMPLATES_PRELOAD'] == '1'
+    app = create_app()
+    created = time.perf_counter()
+
+    client = app.test_client()
+    client.get(PAGES[0]).get_data()
+    first = time.perf_counter()
+    for page in PAGES[1:]:
+        client.get(page).get_data()
+    done = time.perf_counter()
+
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_page_ms': (first - created) * 1000,
+        'all_pages_ms': (done - created) * 1000,
+        'total_ms': (done - started) * 1000,
+    }))
+
+
+def sample(cache_dir, preload):
+    env = dict(
+        os.environ,
+        FLASK_DEBUG='0',
+        REQUEST_TRACE_PATH='',
+        LOG_PATH=os.devnull,
+        BENCH_TEMPLATE_CACHE_DIR=cache_dir or '',
+        BENCH_TEMPLATES_PRELOAD='1' if preload else '0',
+    )
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.cold_start', '--child'],
+        env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def run(samples):
+    cache_dir = tempfile.mkdtemp(prefix='fyyur-jinja-')
+    try:
+        # Fill the bytecode cache the way a deploy would.
+        sample(cache_dir, preload=True)
+        results = {}
+        for mode, options in MODES.items():
+            runs = [sample(cache_dir if options['cache'] else None,
+                           options['preload'])
+                    for _ in range(samples)]
+            results[mode] = {
+                key: round(statistics.median(run[key] for run in runs), 1)
+                for key in runs[0]
+            }
+    finally:
+        shutil.rmtree(cache_dir)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--samples', type=int, default=10)
+    parser.add_argument('--child', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child()
+        return 0
+
+    results = run(args.samples)
+    print('{:<10} {:>10} {:>14} {:>14} {:>13} {:>9}'.format(
+        'mode', 'import ms', 'create_app ms', 'first page ms',
+        'all pages ms', 'total ms'))
+    for mode, result in results.items():
+        print('{:<10} {import_ms:10.1f} {create_app_ms:14.1f} '
+              '{first_page_ms:14.1f} {all_pages_ms:13.1f} '
+              '{total_ms:9.1f}'.format(mode, **result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
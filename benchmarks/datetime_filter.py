@@ -0,0 +1,73 @@
+"""Per-call cost of the ``datetime`` Jinja filter on a page of 10k shows.
+
+Compares the original filter (ISO string re-parsed with dateutil, Babel
+pattern and locale resolved on every call) with ``app.format_datetime``
+fed native datetimes. Run from the repository root:
+
+    python -m benchmarks.datetime_filter
+"""
+import random
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from app import _format_datetime, format_datetime
+
+SHOWS = 10000
+REPEAT = 5
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def start_times(count, seed=0):
+    # Shows cluster on evening slots over a year, as on a real /shows page.
+    rng = random.Random(seed)
+    first = datetime(2026, 1, 1, 19)
+    return [first + timedelta(days=rng.randrange(365),
+                              minutes=30 * rng.randrange(6))
+            for _ in range(count)]
+
+
+def per_call(fn, values, cold=False):
+    def page():
+        if cold:
+            _format_datetime.cache_clear()
+        for value in values:
+            fn(value, 'full')
+    best = min(timeit.repeat(page, number=1, repeat=REPEAT))
+    return best / len(values) * 1e6
+
+
+def main():
+    times = start_times(SHOWS)
+    strings = [value.isoformat() for value in times]
+    assert [legacy_format_datetime(v, 'full') for v in strings[:100]] == \
+        [format_datetime(v, 'full') for v in times[:100]]
+
+    results = [('legacy (isoformat + dateutil)',
+                per_call(legacy_format_datetime, strings))]
+    results.append(('datetime, cold memo',
+                    per_call(format_datetime, times, cold=True)))
+    results.append(('datetime, warm memo',
+                    per_call(format_datetime, times)))
+    results.append(('iso string, warm memo',
+                    per_call(format_datetime, strings)))
+
+    baseline = results[0][1]
+    print('{} shows, best of {}'.format(SHOWS, REPEAT))
+    for name, micros in results:
+        print('{:<32} {:8.2f} us/call {:8.1f}x'.format(
+            name, micros, baseline / micros))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+"""Latency and query-count benchmarks for every route in app.py.
+
+Each dataset size is seeded with ``seed.seed`` into a scratch database and
+every route is driven through the Flask test client. Per route it records
+p50/p95/p99 latency, SQL statements and rows fetched per request, and the
+peak Python memory allocated while serving one request.
+
+The database in BENCH_DATABASE_URL must already be migrated to head
+(``flask db upgrade``); its tables are truncated before each size is
+seeded. Results are written to benchmarks/baselines/<size>.json with
+--save, or compared against those files with --compare; a size with no
+baseline yet is recorded as one instead of compared:
+
+    BENCH_DATABASE_URL=postgresql://localhost/fyyur_bench \\
+        python -m benchmarks.routes --sizes small medium --save
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from operator import itemgetter
+from urllib.parse import urlencode
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines')
+
+SIZES = {
+    'small': {'venues': 100, 'artists': 400, 'shows': 5000},
+    'medium': {'venues': 1000, 'artists': 4000, 'shows': 50000},
+    'large': {'venues': 10000, 'artists': 40000, 'shows': 500000},
+}
+
+# A run is a regression when a latency percentile grows by more than this
+# factor, or when a route issues more statements than its baseline.
+LATENCY_TOLERANCE = 1.5
+
+# Rows per file in the POST /import/<kind> benchmarks.
+IMPORT_ROWS = 1000
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.statements = 0
+        self.rows = 0
+
+    def reset(self):
+        self.statements = 0
+        self.rows = 0
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters,
+                             context, executemany):
+        self.statements += 1
+        if cursor.rowcount and cursor.rowcount > 0:
+            self.rows += cursor.rowcount
+
+
+def _busiest(model, column):
+    return model.query.order_by(column.desc(), model.id).first().id
+
+
+def _past_shows_url(app, model, entity_id):
+    # The "load more" page a profile links to, past its first past shows.
+    from models import profile_shows
+    from pagination import more_cursor
+
+    shows, remaining = profile_shows(
+        model, entity_id, app.config['PROFILE_SHOWS_LIMIT'])['past']
+    cursor = more_cursor(shows, remaining, key=itemgetter('start_time', 'id'))
+    url = '/{}s/{}/past-shows'.format(model.__name__.lower(), entity_id)
+    return url + ('?' + urlencode({'before': cursor}) if cursor else '')
+
+
+def _upload(filename, lines):
+    # A file upload is read as the request is sent, so each request gets a
+    # fresh copy of it.
+    body = ''.join(line + '\n' for line in lines).encode('utf-8')
+    return lambda: {'file': (io.BytesIO(body), filename)}
+
+
+def routes(app):
+    """Yield (name, method, url, form data) for every route.
+
+    Form data is a dict, or a callable returning one for requests that
+    upload a file.
+    """
+    from models import Artist, Venue
+
+    with app.app_context():
+        venue_id = _busiest(Venue, Venue.past_shows_count)
+        artist_id = _busiest(Artist, Artist.past_shows_count)
+        venue = Venue.query.get(venue_id)
+        artist = Artist.query.get(artist_id)
+        venue_form = {
+            'name': 'Bench Venue', 'city': venue.city, 'state': venue.state,
+            'address': '1 Bench St', 'genres': 'Jazz',
+            'facebook_link': 'https://www.facebook.com/bench',
+        }
+        artist_form = dict(venue_form, name='Bench Artist')
+        del artist_form['address']
+        show_form = {
+            'venue_id': venue_id, 'artist_id': artist_id,
+            'start_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        search_word = venue.name.split()[0]
+        venue_past_shows = _past_shows_url(app, Venue, venue_id)
+        artist_past_shows = _past_shows_url(app, Artist, artist_id)
+    artists_upload = _upload('artists.ndjson', (
+        json.dumps(dict(artist_form, name='Bench Import {}'.format(number)))
+        for number in range(IMPORT_ROWS)))
+    # Booked far past the seeded shows, one after another; every iteration
+    # after the first is refused as double bookings.
+    shows_upload = _upload('shows.csv', ['venue_id,artist_id,start_time'] + [
+        '{},{},{:%Y-%m-%d %H:%M:%S}'.format(
+            venue_id, artist_id,
+            datetime(2030, 1, 1) + timedelta(hours=3 * number))
+        for number in range(IMPORT_ROWS)])
+
+    yield 'index', 'GET', '/', None
+    yield 'venues', 'GET', '/venues', None
+    yield 'venues_max_page', 'GET', '/venues?per_page=200', None
+    yield 'search_venues', 'POST', '/venues/search', {
+        'search_term': search_word}
+    yield 'search_venues_typo', 'POST', '/venues/search', {
+        'search_term': search_word[:-1] + 'x'}
+    yield 'show_venue', 'GET', '/venues/{}'.format(venue_id), None
+    yield 'venue_past_shows', 'GET', venue_past_shows, None
+    yield 'edit_venue', 'GET', '/venues/{}/edit'.format(venue_id), None
+    yield 'create_venue_form', 'GET', '/venues/create', None
+    yield 'artists', 'GET', '/artists', None
+    yield 'search_artists', 'POST', '/artists/search', {
+        'search_term': search_word}
+    yield 'show_artist', 'GET', '/artists/{}'.format(artist_id), None
+    yield 'artist_past_shows', 'GET', artist_past_shows, None
+    yield 'edit_artist', 'GET', '/artists/{}/edit'.format(artist_id), None
+    yield 'create_artist_form', 'GET', '/artists/create', None
+    yield 'shows', 'GET', '/shows', None
+    yield 'shows_city_week', 'GET', '/shows?{}'.format(urlencode({
+        'city': venue.city, 'from': '2026-01-01', 'to': '2026-01-07'})), None
+    yield 'shows_calendar', 'GET', '/shows/calendar?{}'.format(urlencode({
+        'city': venue.city, 'from': '2026-01-01'})), None
+    yield 'shows_calendar_json', 'GET', \
+        '/shows/calendar.json?from=2026-01-01', None
+    yield 'create_shows', 'GET', '/shows/create', None
+    yield 'export_shows_venue', 'GET', \
+        '/shows/export.ndjson?venue_id={}'.format(venue_id), None
+    yield 'export_shows_week', 'GET', '/shows/export.csv?{}'.format(urlencode({
+        'from': '2026-01-01', 'to': '2026-01-07'})), None
+    yield 'metrics', 'GET', '/_metrics', None
+    # Writes last, so they disturb the read measurements as little as
+    # possible.
+    yield 'edit_venue_submission', 'POST', \
+        '/venues/{}/edit'.format(venue_id), dict(venue_form, name=venue.name)
+    yield 'edit_artist_submission', 'POST', \
+        '/artists/{}/edit'.format(artist_id), \
+        dict(artist_form, name=artist.name)
+    yield 'create_venue_submission', 'POST', '/venues/create', venue_form
+    yield 'create_artist_submission', 'POST', '/artists/create', artist_form
+    # Every iteration after the first is refused as a double booking, so
+    # this mostly measures the overlap check.
+    yield 'create_show_submission', 'POST', '/shows/create', show_form
+    yield 'import_artists', 'POST', '/import/artists', artists_upload
+    yield 'import_shows', 'POST', '/import/shows', shows_upload
+
+
+def _percentile(samples, percent):
+    return statistics.quantiles(samples, n=100)[percent - 1]
+
+
+def measure(client, counter, method, url, data, iterations):
+    open_ = client.post if method == 'POST' else client.get
+    payload = data if callable(data) else lambda: data
+    samples = []
+    for _ in range(iterations):
+        counter.reset()
+        started = time.perf_counter()
+        response = open_(url, data=payload())
+        response.get_data()
+        samples.append((time.perf_counter() - started) * 1000)
+    statements, rows = counter.statements, counter.rows
+
+    tracemalloc.start()
+    open_(url, data=payload()).get_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'p50_ms': round(_percentile(samples, 50), 3),
+        'p95_ms': round(_percentile(samples, 95), 3),
+        'p99_ms': round(_percentile(samples, 99), 3),
+        'statements': statements,
+        'rows': rows,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def seed_database(app, size):
+    import seed
+    from models import db
+
+    with app.app_context():
+        db.session.execute(
+            'TRUNCATE "Show", "Venue", "Artist" RESTART IDENTITY CASCADE')
+        db.session.commit()
+        seed.seed(seed=0, anchor=datetime(2026, 1, 1), **SIZES[size])
+        db.session.remove()
+
+
+def run(size, iterations, cache):
+    from app import create_app
+    app = create_app()
+
+    app.config['RESPONSE_CACHE_ENABLED'] = cache
+    app.config['METRICS_ENABLED'] = True
+    app.jinja_env.fragment_cache_enabled = cache
+    seed_database(app, size)
+
+    counter = QueryCounter()
+    event.listen(Engine, 'after_cursor_execute',
+                 counter.after_cursor_execute)
+    try:
+        client = app.test_client()
+        results = {}
+        for name, method, url, data in routes(app):
+            results[name] = measure(
+                client, counter, method, url, data, iterations)
+            print('{:<28} {p50_ms:9.2f} {p95_ms:9.2f} {p99_ms:9.2f} '
+                  '{statements:5d} {rows:8d} {peak_kib:9.1f}'.format(
+                      name, **results[name]))
+    finally:
+        event.remove(Engine, 'after_cursor_execute',
+                     counter.after_cursor_execute)
+    return results
+
+
+def compare(size, results):
+    """Regressions against the baseline of ``size``, None if it has none."""
+    path = os.path.join(BASELINES, size + '.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        baseline = json.load(f)['routes']
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if current[key] > previous[key] * LATENCY_TOLERANCE:
+                regressions.append('{} {}: {} -> {}'.format(
+                    name, key, previous[key], current[key]))
+        if current['statements'] > previous['statements']:
+            regressions.append('{} statements: {} -> {}'.format(
+                name, previous['statements'], current['statements']))
+    return regressions
+
+
+def save(size, results, iterations):
+    os.makedirs(BASELINES, exist_ok=True)
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'],
+        capture_output=True, text=True).stdout.strip()
+    with open(os.path.join(BASELINES, size + '.json'), 'w') as f:
+        json.dump({
+            'revision': revision,
+            'dataset': SIZES[size],
+            'iterations': iterations,
+            'routes': results,
+        }, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', nargs='+', choices=SIZES,
+                        default=['small'])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--cache', action='store_true',
+                        help='Leave the response and fragment caches on.')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--save', action='store_true',
+                       help='Write the results as the new baselines.')
+    group.add_argument('--compare', action='store_true',
+                       help='Fail if results regress against the baselines.')
+    args = parser.parse_args(argv)
+
+    url = os.environ.get('BENCH_DATABASE_URL')
+    if not url:
+        parser.error('set BENCH_DATABASE_URL to a scratch database')
+    import config
+    config.SQLALCHEMY_DATABASE_URI = url
+
+    regressions = []
+    for size in args.sizes:
+        print('{} {}'.format(size, SIZES[size]))
+        print('{:<28} {:>9} {:>9} {:>9} {:>5} {:>8} {:>9}'.format(
+            'route', 'p50 ms', 'p95 ms', 'p99 ms', 'stmts', 'rows',
+            'peak KiB'))
+        results = run(size, args.iterations, args.cache)
+        if args.save:
+            save(size, results, args.iterations)
+        if args.compare:
+            found = compare(size, results)
+            if found is None:
+                print('no baseline for {}: recorded this run as {}'.format(
+                    size, os.path.join(BASELINES, size + '.json')))
+                save(size, results, args.iterations)
+                continue
+            regressions += ['{}: {}'.format(size, regression)
+                            for regression in found]
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
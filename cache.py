@@ -0,0 +1,389 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from flask import current_app, request, session
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from werkzeug.utils import import_string
+
+from routing import use_primary
+
+# ----------------------------------------------------------------------------#
+# Backends.
+# ----------------------------------------------------------------------------#
+
+# A backend stores cache entries, which may be evicted at any time, and
+# generation counters, which must not be: every entry key embeds the
+# generations of the models it was built from, so bumping a generation
+# invalidates exactly the entries that depend on that model.
+#
+# Backends implement get(key), get_many(keys), set(key, value, ttl),
+# generation(name), generations(names), bump(name) and stats(). get_many()
+# and generations() take a whole page's worth of keys in one round trip.
+
+
+class LRUCache:
+    """In-process least-recently-used cache with a per-entry TTL.
+
+    Generations are never evicted to make room for others: a dropped name
+    would read as a new value and miss every entry built on it. A name is
+    only forgotten once no entry keyed by an earlier generation of it can
+    still be alive, twice the longest entry TTL after its last bump; it
+    then reads as 0 again. Every bump takes the next value of one counter,
+    so a generation already used for a name never comes back for it.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # name -> (generation, monotonic time of the bump), oldest first.
+        self._generations = OrderedDict()
+        self._counter = 0
+        self._longest_ttl = ttl
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl
+        with self._lock:
+            self._longest_ttl = max(self._longest_ttl, ttl)
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, name):
+        entry = self._generations.get(name)
+        return 0 if entry is None else entry[0]
+
+    def generations(self, names):
+        return [self.generation(name) for name in names]
+
+    def bump(self, name):
+        now = time.monotonic()
+        with self._lock:
+            self._counter += 1
+            self._generations[name] = (self._counter, now)
+            self._generations.move_to_end(name)
+            forget_before = now - 2 * self._longest_ttl
+            while next(iter(self._generations.values()))[1] < forget_before:
+                self._generations.popitem(last=False)
+
+    def stats(self):
+        return {
+            'backend': 'lru',
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'generations': len(self._generations),
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class RedisCache:
+    """Cache shared by every worker, stored in Redis.
+
+    Needs the optional ``redis`` package; select it with
+    RESPONSE_CACHE_BACKEND = 'cache.redis_backend'.
+    """
+
+    def __init__(self, client, ttl=300, prefix='fyyur:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return self.client.mget([self.prefix + key for key in keys])
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value,
+                        ex=self.ttl if ttl is None else ttl)
+
+    def generation(self, name):
+        return int(self.client.get(self.prefix + 'generation:' + name) or 0)
+
+    def generations(self, names):
+        return [int(value or 0) for value in self.get_many(
+            ['generation:' + name for name in names])]
+
+    def bump(self, name):
+        self.client.incr(self.prefix + 'generation:' + name)
+
+    def stats(self):
+        info = self.client.info('stats')
+        return {
+            'backend': 'redis',
+            'size': self.client.dbsize(),
+            'evictions': info.get('evicted_keys'),
+            'expirations': info.get('expired_keys'),
+        }
+
+
+def redis_backend(app):
+    import redis
+    client = redis.Redis.from_url(app.config['RESPONSE_CACHE_URL'])
+    return RedisCache(client, ttl=app.config['RESPONSE_CACHE_TTL'])
+
+
+# ----------------------------------------------------------------------------#
+# Response cache.
+# ----------------------------------------------------------------------------#
+
+
+class ResponseCache:
+    """Caches whole GET responses until a commit touches their models.
+
+    Each app initialised with it gets its own backend, kept in
+    ``app.extensions['response_cache']``.
+    """
+
+    def __init__(self, app=None):
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('RESPONSE_CACHE_TTL', 300)
+        app.config.setdefault('RESPONSE_CACHE_BACKEND', None)
+        app.config.setdefault('FRAGMENT_CACHE_ENABLED', True)
+        factory = app.config['RESPONSE_CACHE_BACKEND']
+        if factory:
+            if isinstance(factory, str):
+                factory = import_string(factory)
+            backend = factory(app)
+        else:
+            backend = LRUCache(app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+                               app.config['RESPONSE_CACHE_TTL'])
+        app.extensions['response_cache'] = backend
+        if not event.contains(Session, 'after_flush', _collect_flushed):
+            event.listen(Session, 'after_flush', _collect_flushed)
+            event.listen(Session, 'after_bulk_update', _collect_bulk)
+            event.listen(Session, 'after_bulk_delete', _collect_bulk)
+            event.listen(Session, 'after_rollback', _discard_changes)
+            event.listen(Session, 'after_commit', _invalidate_committed)
+
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self
+        app.jinja_env.fragment_cache_enabled = \
+            app.config['FRAGMENT_CACHE_ENABLED']
+        app.jinja_env.globals['cache_version'] = self.version
+        app.jinja_env.globals['fragment_batch'] = self.fragment_batch
+
+    @property
+    def backend(self):
+        """The backend of the current app."""
+        return current_app.extensions['response_cache']
+
+    def invalidate(self, *models):
+        """Drop every cached response built from any of ``models``."""
+        for model in models:
+            name = model if isinstance(model, str) else model.__name__
+            self.backend.bump(name)
+
+    def version(self, model, entity_id):
+        """Version stamp of one row, bumped whenever a commit changes it."""
+        return self.backend.generation('{}:{}'.format(model, entity_id))
+
+    def fragment_batch(self, name, rows, **versions):
+        """Look up the cached ``name`` fragment of every row at once.
+
+        ``versions`` maps each model a fragment renders to the row field
+        holding its id, e.g. ``Show='id', Venue='venue_id'``. Returns one
+        Fragment per row, to pass to ``{% cache %}``; all the row versions
+        and then all the fragments are fetched in one call each.
+        """
+        rows = list(rows)
+        if not current_app.jinja_env.fragment_cache_enabled:
+            return [Fragment(None, None) for _ in rows]
+        ids = [[row[field] if isinstance(row, dict) else getattr(row, field)
+                for field in versions.values()] for row in rows]
+        generations = iter(self.backend.generations([
+            '{}:{}'.format(model, entity_id)
+            for row_ids in ids
+            for model, entity_id in zip(versions, row_ids)]))
+        keys = ['fragment:' + ':'.join(
+            [name] + ['{}.{}'.format(entity_id, next(generations))
+                      for entity_id in row_ids])
+            for row_ids in ids]
+        return [Fragment(key, markup) for key, markup in
+                zip(keys, self.backend.get_many(keys))]
+
+    def _key(self, models, vary):
+        generations = '.'.join(str(generation) for generation in
+                               self.backend.generations(
+                                   [model.__name__ for model in models]))
+        query = '&'.join(sorted(
+            '{}={}'.format(key, value)
+            for key, values in request.args.lists() for value in values))
+        key = 'response:{}?{}|{}'.format(request.path, query, generations)
+        if vary is not None:
+            key += '|' + str(vary())
+        return key
+
+    def cached(self, *models, vary=None):
+        """Cache a view's response until a commit changes one of ``models``.
+
+        Responses are only cached for GET requests with no flashed messages
+        waiting, since those render into the page. A response that is going
+        to be stored is read from the primary database, never a replica.
+        ``vary`` is called for anything else the response depends on, such
+        as today's date, and its result added to the key.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if (not current_app.config['RESPONSE_CACHE_ENABLED']
+                        or request.method != 'GET'
+                        or session.get('_flashes')):
+                    return view(*args, **kwargs)
+
+                key = self._key(models, vary)
+                cached = self.backend.get(key)
+                if cached is not None:
+                    self.hits += 1
+                    response = current_app.response_class(cached)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self.misses += 1
+                use_primary()
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.backend.set(key, response.get_data())
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        stats = dict(self.backend.stats(), hits=self.hits, misses=self.misses)
+        lookups = self.hits + self.misses
+        stats['hit_ratio'] = self.hits / lookups if lookups else None
+        return stats
+
+
+def _collect_flushed(db_session, flush_context):
+    changed = db_session.info.setdefault('changed_models', set())
+    for instance in db_session.new | db_session.dirty | db_session.deleted:
+        name = type(instance).__name__
+        changed.add(name)
+        identity = inspect(instance).identity
+        if identity is not None:
+            changed.add('{}:{}'.format(name, identity[0]))
+
+
+def _collect_bulk(context):
+    changed = context.session.info.setdefault('changed_models', set())
+    changed.add(context.mapper.class_.__name__)
+
+
+def _discard_changes(db_session):
+    db_session.info.pop('changed_models', None)
+
+
+def _invalidate_committed(db_session):
+    changed = db_session.info.pop('changed_models', ())
+    # Flask-SQLAlchemy sessions know their app; commits on other sessions
+    # have no cache to invalidate.
+    app = getattr(db_session, 'app', None)
+    backend = app.extensions.get('response_cache') if app else None
+    if backend is not None:
+        for name in changed:
+            backend.bump(name)
+
+
+# ----------------------------------------------------------------------------#
+# Fragment cache.
+# ----------------------------------------------------------------------------#
+
+
+# A fragment_batch() entry: the cache key of one row's fragment and its
+# cached markup, None on a miss.
+Fragment = namedtuple('Fragment', 'key markup')
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja ``{% cache %}`` tag storing rendered markup in the cache.
+
+    Usage::
+
+        {% cache 'show-tile', show.id, cache_version('Show', show.id) %}
+            ...
+        {% endcache %}
+
+    The arguments form the key; include a cache_version() stamp for every
+    row the fragment renders so that a commit changing one of them makes
+    the fragment render afresh. Every argument costs the backend a
+    lookup, so in a loop fetch the whole loop's fragments up front and
+    pass each one to the tag instead::
+
+        {% set tiles = fragment_batch('show-tile', shows, Show='id') %}
+        {% for show in shows %}
+        {% cache tiles[loop.index0] %}
+            ...
+        {% endcache %}
+        {% endfor %}
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_render', [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, parts, caller):
+        if not self.environment.fragment_cache_enabled:
+            return caller()
+        backend = self.environment.fragment_cache.backend
+        if len(parts) == 1 and isinstance(parts[0], Fragment):
+            key, markup = parts[0]
+        else:
+            key = 'fragment:' + ':'.join(str(part) for part in parts)
+            markup = backend.get(key)
+        if markup is None:
+            markup = caller()
+            backend.set(key, str(markup))
+        elif isinstance(markup, bytes):
+            markup = markup.decode('utf-8')
+        return Markup(markup)
+
+
+response_cache = ResponseCache()
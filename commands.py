@@ -0,0 +1,165 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+import assets
+import export
+import importer
+import seed as seeding
+import templating
+from cache import response_cache
+from models import Artist, Show, Venue, refresh_show_counters
+
+# ----------------------------------------------------------------------------#
+# Commands.
+# ----------------------------------------------------------------------------#
+
+
+@click.command('rollover-shows')
+@with_appcontext
+@click.option('--minutes', default=60, show_default=True,
+              help='Recount venues and artists with shows that started '
+                   'within this many minutes.')
+@click.option('--all', 'full', is_flag=True,
+              help='Recount every venue and artist.')
+def rollover_shows(minutes, full):
+    """Move shows whose start time has passed from upcoming to past."""
+    since = None if full else datetime.now() - timedelta(minutes=minutes)
+    refresh_show_counters(since)
+    response_cache.invalidate(Venue, Artist)
+
+
+@click.command('export-shows')
+@with_appcontext
+@click.option('--format', 'format', type=click.Choice(sorted(export.FORMATS)),
+              default='ndjson', show_default=True)
+@click.option('--output', type=click.File('w'), default='-',
+              help='File to write to; standard output by default.')
+@click.option('--from', 'start', type=click.DateTime(),
+              help='Only shows starting at or after this time.')
+@click.option('--to', 'end', type=click.DateTime(),
+              help='Only shows starting before this time.')
+@click.option('--venue-id', type=int, help='Only shows at this venue.')
+def export_shows_command(format, output, start, end, venue_id):
+    """Stream every show with its venue and artist."""
+    serialize, _ = export.FORMATS[format]
+    rows = export.show_rows(start=start, end=end, venue_id=venue_id)
+    for chunk in serialize(rows):
+        output.write(chunk)
+
+
+@click.command('import-data')
+@with_appcontext
+@click.argument('kind', type=click.Choice(sorted(importer.IMPORTS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format', type=click.Choice(['csv', 'ndjson']),
+              help='Input format; guessed from the file extension.')
+@click.option('--batch-size', default=5000, show_default=True)
+@click.option('--method', type=click.Choice(['copy', 'insert']),
+              help='COPY on Postgres, executemany INSERT elsewhere.')
+@click.option('--resume', is_flag=True,
+              help='Skip the rows committed by an earlier, interrupted run.')
+@click.option('--errors', type=click.File('w'), default='-',
+              help='Where to write per-row errors as NDJSON.')
+def import_data_command(kind, path, format, batch_size, method, resume,
+                        errors):
+    """Bulk load venues, artists or shows from CSV or NDJSON."""
+    checkpoint_path = path + '.checkpoint'
+    skip = 0
+    if resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            skip = int(f.read() or 0)
+
+    def checkpoint(processed):
+        with open(checkpoint_path, 'w') as f:
+            f.write(str(processed))
+
+    started = time.perf_counter()
+    with open(path, newline='', encoding='utf-8') as stream:
+        report = importer.import_rows(
+            kind,
+            importer.read_rows(stream, importer.import_format(path, format)),
+            skip=skip, batch_size=batch_size, method=method,
+            checkpoint=checkpoint)
+    elapsed = time.perf_counter() - started
+    for error in report.to_dict()['errors']:
+        errors.write(json.dumps(error) + '\n')
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    click.echo('Imported {} {} ({} rows with errors) in {:.1f}s, '
+               '{:.0f} rows/s'.format(
+                   report.imported, kind,
+                   len({row for row, _, _ in report.errors}), elapsed,
+                   (report.processed - report.skipped) / elapsed
+                   if elapsed else 0), err=True)
+
+
+@click.command('seed')
+@with_appcontext
+@click.option('--venues', default=500, show_default=True)
+@click.option('--artists', default=2000, show_default=True)
+@click.option('--shows', default=50000, show_default=True)
+@click.option('--seed', default=0, show_default=True,
+              help='Random seed; the same seed gives the same data.')
+@click.option('--anchor', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Date past and upcoming shows are spread around; '
+                   'today by default.')
+@click.option('--batch-size', default=50000, show_default=True)
+@click.option('--method', type=click.Choice(['copy', 'insert']),
+              help='COPY on Postgres, executemany INSERT elsewhere.')
+def seed_command(venues, artists, shows, seed, anchor, batch_size, method):
+    """Fill the database with a synthetic dataset.
+
+    For example: flask seed --venues 50000 --artists 200000 --shows 5000000
+    """
+    started = time.perf_counter()
+    seeding.seed(venues, artists, shows, seed=seed, anchor=anchor,
+                 batch_size=batch_size, method=method, echo=click.echo)
+    response_cache.invalidate(Venue, Artist, Show)
+    click.echo('Done in {:.1f}s'.format(time.perf_counter() - started))
+
+
+@click.command('precompile-templates')
+@with_appcontext
+def precompile_templates_command():
+    """Compile every template into TEMPLATE_CACHE_DIR."""
+    app = current_app._get_current_object()
+    if not app.config['TEMPLATE_CACHE_DIR']:
+        raise click.UsageError('TEMPLATE_CACHE_DIR is not set')
+    started = time.perf_counter()
+    names = templating.precompile(app)
+    click.echo('Compiled {} templates into {} in {:.2f}s'.format(
+        len(names), app.config['TEMPLATE_CACHE_DIR'],
+        time.perf_counter() - started))
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Bundle, minify and compress the static assets into static/dist."""
+    static_folder = current_app.static_folder
+    manifest = assets.build(static_folder)
+    for name, filename in sorted(manifest.items()):
+        path = os.path.join(static_folder, assets.DIST, filename)
+        sources = sum(os.path.getsize(os.path.join(static_folder, source))
+                      for source in assets.BUNDLES[name])
+        sizes = ['{} bytes from {}'.format(os.path.getsize(path), sources)]
+        for suffix in ('.gz', '.br'):
+            if os.path.exists(path + suffix):
+                sizes.append('{} {}'.format(
+                    os.path.getsize(path + suffix), suffix))
+        click.echo('{}: {}'.format(filename, ', '.join(sizes)))
+
+
+def init_app(app):
+    app.cli.add_command(rollover_shows)
+    app.cli.add_command(export_shows_command)
+    app.cli.add_command(import_data_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(precompile_templates_command)
+    app.cli.add_command(build_assets_command)
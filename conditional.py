@@ -0,0 +1,55 @@
+import hashlib
+from functools import wraps
+
+from flask import current_app, request, session
+
+# ----------------------------------------------------------------------------#
+# Conditional GETs.
+# ----------------------------------------------------------------------------#
+
+
+def conditional(state):
+    """Answer a GET with 304 Not Modified when the page has not changed.
+
+    ``state`` is called with the view's arguments and returns None (let
+    the view answer, e.g. with a 404) or ``(values, last_modified)``. The
+    values are hashed into the ETag, and last_modified is a naive UTC
+    datetime. When the request's If-None-Match or If-Modified-Since
+    matches, the view is not called at all.
+
+    Pages with flashed messages waiting are always rendered, since the
+    messages are part of the page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or \
+                    session.get('_flashes'):
+                return view(*args, **kwargs)
+            found = state(*args, **kwargs)
+            if found is None:
+                return view(*args, **kwargs)
+            values, last_modified = found
+            etag = hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+            last_modified = last_modified.replace(microsecond=0)
+
+            if request.if_none_match:
+                fresh = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                fresh = since is not None and \
+                    last_modified <= since.replace(tzinfo=None)
+            if fresh:
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Browsers may keep the page but must ask before reusing it.
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -1,15 +1,136 @@
 import os
-SECRET_KEY = os.urandom(32)
+
+from dbpool import MeteredQueuePool
+
+# Set SECRET_KEY when running more than one worker, so every worker accepts
+# the session cookies the others sign.
+SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+# Enable debug mode; FLASK_DEBUG=0 turns it off (gunicorn.conf.py does).
+DEBUG = os.environ.get('FLASK_DEBUG', '1') == '1'
 
 # Connect to the database
 
 
-# TODO IMPLEMENT DATABASE URL
 SQLALCHEMY_TRACK_MODIFICATIONS = False
-SQLALCHEMY_DATABASE_URI = 'postgresql://wailynnzaw@localhost:5432/fyyur'
+SQLALCHEMY_DATABASE_URI = os.environ.get(
+    'DATABASE_URL', 'postgresql://wailynnzaw@localhost:5432/fyyur')
+
+# Connection pool, per worker process. A checkout waits up to
+# DB_POOL_TIMEOUT seconds once DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+# are in use; connections older than DB_POOL_RECYCLE seconds are replaced,
+# and DB_POOL_PRE_PING tests each one before use so a restarted server
+# does not fail the next request. Checkout waits, connections in use and
+# overflow are reported under db_pool in /_metrics.
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'poolclass': MeteredQueuePool,
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+    'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+    'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+}
+
+# Read replicas (see routing.py): DATABASE_REPLICA_URLS is a comma-separated
+# list of URLs, each becoming a bind that read-only requests are spread
+# over. After a user commits, their reads stay on the primary for
+# READ_YOUR_WRITES_SECONDS. A page the response cache is going to store is
+# always read from the primary: a page built from a lagging replica would
+# be stored under the generation the newer commit bumped, and served stale
+# to everyone for RESPONSE_CACHE_TTL.
+SQLALCHEMY_BINDS = {
+    'replica_{}'.format(number): url.strip()
+    for number, url in enumerate(
+        os.environ.get('DATABASE_REPLICA_URLS', '').split(','), start=1)
+    if url.strip()
+}
+SQLALCHEMY_REPLICA_BINDS = sorted(SQLALCHEMY_BINDS)
+READ_YOUR_WRITES_SECONDS = 5
+
+
+# /_metrics reports cache, pool, trace and log internals, unauthenticated;
+# only turn it on where it cannot be reached from outside.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '') == '1'
+
+# Per-request SQL query budgets (see instrumentation.py). Views declare a
+# budget with @query_budget; going over it raises when this is True, logs a
+# warning when False, and None means "raise only when TESTING".
+QUERY_BUDGET_RAISE = None
+# Warn about a likely N+1 when one statement runs this often in a request.
+QUERY_REPEAT_THRESHOLD = 3
+
+# Keyset pagination for the list pages; ?per_page= is clamped to
+# MAX_PAGE_SIZE.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Most results a venue or artist search returns; the page still reports the
+# total number of matches.
+SEARCH_LIMIT = 100
+
+# Shows listed per bucket (upcoming, past) on a venue or artist page; older
+# past shows are paged in PROFILE_SHOWS_LIMIT at a time.
+PROFILE_SHOWS_LIMIT = 20
+
+# /shows/calendar spans CALENDAR_DAYS from ?from= (today by default) unless
+# ?to= is given; longer windows than CALENDAR_MAX_DAYS are refused, and at
+# most CALENDAR_MAX_SHOWS shows are listed in one window.
+CALENDAR_DAYS = 7
+CALENDAR_MAX_DAYS = 62
+CALENDAR_MAX_SHOWS = 500
+
+# Whole-page cache for /venues, /artists and /shows, invalidated when a
+# commit touches the models a page is built from. RESPONSE_CACHE_BACKEND is
+# an import path to a factory taking the app, e.g. 'cache.redis_backend'
+# (with RESPONSE_CACHE_URL) to share one cache between workers and with the
+# flask CLI commands; unset keeps an in-process LRU of
+# RESPONSE_CACHE_MAX_ENTRIES pages, which only sees the commits made in its
+# own process. gunicorn.conf.py turns both caches off when it runs several
+# workers without a shared backend.
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND') or None
+RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL')
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+RESPONSE_CACHE_TTL = 300
+# Cache rendered {% cache %} fragments (show, venue and artist tiles) in the
+# same backend, keyed by row version stamps.
+FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'
+
+# Rows per transaction for POST /import/<kind>.
+IMPORT_BATCH_SIZE = 5000
+
+# Per-request timing trace (see tracing.py): the share of requests appended
+# to REQUEST_TRACE_PATH as JSON lines, and whether responses carry a
+# Server-Timing header.
+REQUEST_TRACE_PATH = os.environ.get('REQUEST_TRACE_PATH', 'requests.jsonl')
+REQUEST_TRACE_SAMPLE_RATE = float(
+    os.environ.get('REQUEST_TRACE_SAMPLE_RATE', '1.0'))
+REQUEST_TRACE_QUEUE_SIZE = 10000
+SERVER_TIMING_HEADER = True
+
+# Application log (see logs.py): written by a background thread, rotated by
+# size, as text or JSON lines. Records are dropped rather than blocking a
+# request once LOG_QUEUE_SIZE are waiting. LOG_MAX_BYTES = 0 leaves rotation
+# to logrotate or similar, as it must be when several processes share the
+# file.
+LOG_PATH = os.environ.get('LOG_PATH', 'error.log')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = 5
+LOG_JSON = os.environ.get('LOG_JSON', '') == '1'
+LOG_QUEUE_SIZE = 10000
+
+# Templates (see templating.py). Outside debug mode templates are not
+# checked for changes on every render, are all compiled when the app is
+# created, and are stored compiled in TEMPLATE_CACHE_DIR, which
+# `flask precompile-templates` fills at deploy time.
+TEMPLATES_AUTO_RELOAD = DEBUG
+TEMPLATES_PRELOAD = not DEBUG
+TEMPLATE_CACHE_DIR = os.environ.get(
+    'TEMPLATE_CACHE_DIR', os.path.join(basedir, '.jinja_cache'))
 
+# Static assets (see assets.py): link the bundles built by
+# `flask build-assets` rather than the source files, unless in debug mode.
+ASSETS_DEBUG = DEBUG
@@ -0,0 +1,56 @@
+import os
+import types
+
+import pytest
+
+import config
+
+
+@pytest.fixture(scope='module')
+def settings():
+    """A copy of config, set up not to touch a database or the disk.
+
+    Set TEST_DATABASE_URL to run against a scratch Postgres database.
+    Test modules adjust it by overriding this fixture.
+    """
+    settings = types.SimpleNamespace(**{
+        name: value for name, value in vars(config).items()
+        if name.isupper()})
+    settings.SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'TEST_DATABASE_URL', 'sqlite://')
+    settings.SQLALCHEMY_ENGINE_OPTIONS = {}
+    settings.SQLALCHEMY_BINDS = None
+    settings.SQLALCHEMY_REPLICA_BINDS = []
+    settings.REQUEST_TRACE_PATH = None
+    settings.TEMPLATES_PRELOAD = False
+    settings.TESTING = True
+    return settings
+
+
+@pytest.fixture
+def app(settings):
+    from app import create_app
+    return create_app(settings)
+
+
+@pytest.fixture
+def tables(app):
+    """The app's tables, for tests that read and write rows.
+
+    On SQLite, which cannot build the Postgres column types, constraints
+    and indexes, every table is a bare copy: the same columns, untyped.
+    """
+    from models import db
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            db.create_all()
+            yield db
+            db.session.remove()
+            db.drop_all()
+            return
+        for table in db.metadata.sorted_tables:
+            db.engine.execute('CREATE TABLE "{}" (id INTEGER PRIMARY KEY, {})'
+                              .format(table.name, ', '.join(
+                                  column.name for column in table.columns
+                                  if column.name != 'id')))
+        yield db
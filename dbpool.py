@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# ----------------------------------------------------------------------------#
+# Connection pool metrics.
+# ----------------------------------------------------------------------------#
+
+# MeteredQueuePool is a QueuePool that records how long each checkout waited
+# for a connection, how often the pool had to open overflow connections
+# beyond pool_size, and how often a checkout timed out. Select it with
+# SQLALCHEMY_ENGINE_OPTIONS['poolclass']; /_metrics reports stats().
+
+
+class PoolMetrics:
+
+    def __init__(self, samples=1000):
+        self.checkouts = 0
+        self.overflows = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_in_use = 0
+        self._waits = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def record_checkout(self, wait, in_use):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+            self._waits.append(wait)
+
+    def wait_percentile(self, percent):
+        with self._lock:
+            waits = sorted(self._waits)
+        if not waits:
+            return None
+        return waits[min(len(waits) - 1, len(waits) * percent // 100)]
+
+
+class MeteredQueuePool(QueuePool):
+
+    def __init__(self, *args, **kwargs):
+        self.metrics = kwargs.pop('metrics', None) or PoolMetrics()
+        super().__init__(*args, **kwargs)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started,
+                                     self.checkedout())
+        return conn
+
+    def _inc_overflow(self):
+        opened = super()._inc_overflow()
+        if opened and self._overflow > 0:
+            self.metrics.overflows += 1
+        return opened
+
+    def recreate(self):
+        # Keep the counters when the engine replaces its pool, e.g. after
+        # a disconnect invalidates every connection.
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+# Pre-forking servers may fork after the pool has opened connections. A
+# child must never use (or close) a socket its parent opened, so each
+# connection remembers the pid that opened it. On checkout in another
+# process, the connection is detached without closing it, and the pool
+# replaces it with a new one.
+def _remember_pid(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+
+def _check_pid(dbapi_connection, connection_record, connection_proxy):
+    pid = os.getpid()
+    if connection_record.info['pid'] != pid:
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError(
+            'Connection record belongs to pid {}, attempting to check out '
+            'in pid {}'.format(connection_record.info['pid'], pid))
+
+
+event.listen(MeteredQueuePool, 'connect', _remember_pid)
+event.listen(MeteredQueuePool, 'checkout', _check_pid)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def stats(engine):
+    pool = engine.pool
+    metrics = getattr(pool, 'metrics', None)
+    if metrics is None:
+        return {'pool': type(pool).__name__}
+    return {
+        'size': pool.size(),
+        'in_use': pool.checkedout(),
+        'idle': pool.checkedin(),
+        'overflow_in_use': max(pool.overflow(), 0),
+        'peak_in_use': metrics.peak_in_use,
+        'checkouts': metrics.checkouts,
+        'overflows': metrics.overflows,
+        'timeouts': metrics.timeouts,
+        'wait_total_ms': _ms(metrics.wait_total),
+        'wait_max_ms': _ms(metrics.wait_max),
+        'wait_p95_ms': _ms(metrics.wait_percentile(95)),
+    }
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from models import db, Artist, Venue, Show
+
+# ----------------------------------------------------------------------------#
+# Show catalog export.
+# ----------------------------------------------------------------------------#
+
+# Rows are read through a server-side cursor in batches and written out one
+# at a time, so an export holds a single batch in memory however large the
+# catalog is, and the first bytes go out as soon as the first batch arrives.
+
+EXPORT_COLUMNS = (
+    'show_id',
+    'start_time',
+    'duration',
+    'venue_id',
+    'venue_name',
+    'venue_city',
+    'venue_state',
+    'artist_id',
+    'artist_name',
+)
+
+
+def show_rows(start=None, end=None, venue_id=None, batch_size=1000):
+    query = db.session.query(
+        Show.id,
+        Show.start_time,
+        Show.duration,
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Artist.id,
+        Artist.name
+    ).join(
+        Venue, Show.venue_id == Venue.id
+    ).join(
+        Artist, Show.artist_id == Artist.id)
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end)
+    if venue_id is not None:
+        query = query.filter(Show.venue_id == venue_id)
+    return query.order_by(Show.id).execution_options(
+        stream_results=True).yield_per(batch_size)
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def to_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, map(_serialize, row)))) + '\n'
+
+
+def to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(map(_serialize, row))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+FORMATS = {
+    'ndjson': (to_ndjson, 'application/x-ndjson'),
+    'csv': (to_csv, 'text/csv'),
+}
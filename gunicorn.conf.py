@@ -0,0 +1,43 @@
+import multiprocessing
+import os
+
+# ----------------------------------------------------------------------------#
+# Production server: gunicorn -c gunicorn.conf.py wsgi:app
+# ----------------------------------------------------------------------------#
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '8000')
+
+# One worker process per core (plus one to cover a worker blocked on I/O)
+# unless WEB_CONCURRENCY says otherwise. Each worker has its own database
+# pool, so workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay below the
+# server's max_connections.
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get('WEB_THREADS', '1'))
+timeout = int(os.environ.get('WEB_TIMEOUT', '30'))
+
+# Production settings unless the environment says otherwise.
+raw_env = ['FLASK_DEBUG=' + os.environ.get('FLASK_DEBUG', '0')]
+
+# Without RESPONSE_CACHE_BACKEND the response and fragment caches live in
+# each worker, and a commit only invalidates the copy in the worker that
+# made it, so the other workers would keep serving stale pages. Several
+# workers need a shared backend such as 'cache.redis_backend'; without one
+# the caches are turned off.
+if workers > 1 and not os.environ.get('RESPONSE_CACHE_BACKEND'):
+    raw_env += ['RESPONSE_CACHE_ENABLED=0', 'FRAGMENT_CACHE_ENABLED=0']
+
+# Every worker appends to the same LOG_PATH, and only one process can rotate
+# it by size, so several workers leave rotation to logrotate (with no
+# copytruncate needed: the workers reopen the file once it is moved).
+if workers > 1:
+    raw_env += ['LOG_MAX_BYTES=0']
+
+# Import the app once in the master and fork the workers from it. Pools and
+# the log and trace writer threads reset themselves in each child (see
+# dbpool.py, logs.py and tracing.py).
+preload_app = True
+
+# Recycle workers now and then so slow leaks cannot build up.
+max_requests = 10000
+max_requests_jitter = 1000
@@ -0,0 +1,355 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+from wtforms import (
+    BooleanField,
+    DateTimeField,
+    IntegerField,
+    SelectField,
+    SelectMultipleField
+)
+from wtforms.fields.core import UnboundField
+from wtforms.validators import StopValidation, ValidationError
+
+from forms import ArtistForm, ShowForm, VenueForm
+from models import (
+    DEFAULT_SHOW_DURATION,
+    db,
+    Artist,
+    Venue,
+    Show,
+    is_booking_conflict,
+    refresh_show_counters
+)
+
+# ----------------------------------------------------------------------------#
+# Row validation.
+# ----------------------------------------------------------------------------#
+
+# Imported rows are checked against the same fields, choices and validators
+# as the web forms. The validator objects are taken from the form classes
+# and run against a bare value holder, so no form is built per row.
+
+
+class _Value:
+    __slots__ = ('data', 'errors')
+
+    def __init__(self, data):
+        self.data = data
+        self.errors = []
+
+    def gettext(self, string):
+        return string
+
+    def ngettext(self, singular, plural, n):
+        return singular if n == 1 else plural
+
+
+class _FieldRule:
+
+    def __init__(self, name, column, unbound):
+        self.name = name
+        self.column = column
+        self.field_class = unbound.field_class
+        self.validators = unbound.kwargs.get('validators') or []
+        choices = unbound.kwargs.get('choices')
+        self.choices = None if choices is None else {
+            value for value, _ in choices}
+        self.format = unbound.kwargs.get('format', '%Y-%m-%d %H:%M:%S')
+
+    def coerce(self, value):
+        if issubclass(self.field_class, SelectMultipleField):
+            if value is None or value == '':
+                return []
+            if isinstance(value, str):
+                return [item.strip() for item in value.split(';')]
+            return list(value)
+        if issubclass(self.field_class, BooleanField):
+            return value not in BooleanField.false_values and value is not None
+        if value is None:
+            value = ''
+        if issubclass(self.field_class, IntegerField):
+            if value == '':
+                return None
+            try:
+                return int(value)
+            except ValueError:
+                raise ValueError('Not a valid integer value')
+        if issubclass(self.field_class, DateTimeField):
+            if isinstance(value, datetime) or value == '':
+                return value or None
+            try:
+                return datetime.strptime(value, self.format)
+            except ValueError:
+                try:
+                    return datetime.fromisoformat(value)
+                except ValueError:
+                    raise ValueError('Not a valid datetime value')
+        return value if isinstance(value, str) else str(value)
+
+    def validate(self, value):
+        """Return the coerced value of the field, or raise ValueError."""
+        value = self.coerce(value)
+        holder = _Value(value)
+        for validator in self.validators:
+            try:
+                validator(None, holder)
+            except (StopValidation, ValidationError) as e:
+                raise ValueError(str(e))
+        if self.choices is not None:
+            if issubclass(self.field_class, SelectMultipleField):
+                for item in value:
+                    if item not in self.choices:
+                        raise ValueError(
+                            "'{}' is not a valid choice for this field"
+                            .format(item))
+            elif (issubclass(self.field_class, SelectField)
+                    and value not in self.choices):
+                raise ValueError('Not a valid choice')
+        return value
+
+
+class ImportSpec:
+
+    def __init__(self, form_class, model, columns=None, integers=(),
+                 defaults=None):
+        columns = columns or {}
+        self.defaults = defaults or {}
+        unbound = sorted(
+            ((name, field) for name, field in vars(form_class).items()
+             if isinstance(field, UnboundField)),
+            key=lambda item: item[1].creation_counter)
+        self.model = model
+        self.table = model.__table__
+        self.integers = set(integers)
+        self.rules = [_FieldRule(name, columns.get(name, name), field)
+                      for name, field in unbound]
+
+    def validate(self, row):
+        """Map one input row to column values; return (values, errors)."""
+        values = {}
+        errors = []
+        for rule in self.rules:
+            raw = row.get(rule.name, row.get(rule.column))
+            if raw in (None, '') and rule.name in self.defaults:
+                raw = self.defaults[rule.name]
+            try:
+                value = rule.validate(raw)
+                if rule.name in self.integers:
+                    value = int(value)
+            except ValueError as e:
+                message = str(e)
+                if rule.name in self.integers and 'invalid literal' in message:
+                    message = 'Not a valid integer value'
+                errors.append((rule.name, message))
+                continue
+            values[rule.column] = value
+        return values, errors
+
+
+IMPORTS = {
+    'venues': ImportSpec(VenueForm, Venue, {'website_link': 'website'}),
+    'artists': ImportSpec(ArtistForm, Artist, {'website_link': 'website'}),
+    'shows': ImportSpec(ShowForm, Show, integers=('artist_id', 'venue_id'),
+                        defaults={'duration': DEFAULT_SHOW_DURATION}),
+}
+
+# ----------------------------------------------------------------------------#
+# Loading.
+# ----------------------------------------------------------------------------#
+
+
+def import_format(filename, format=None):
+    """The format to read ``filename`` as: ``format`` if given, else its
+    extension. Anything but csv is read as NDJSON."""
+    format = format or os.path.splitext(filename or '')[1].lstrip('.')
+    return 'csv' if format == 'csv' else 'ndjson'
+
+
+def read_rows(stream, format):
+    """Yield ``(row number, row)`` pairs; ``row`` is None if unreadable."""
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def _copy_value(value):
+    # COPY's CSV format reads an unquoted empty field as NULL and a quoted
+    # one as a string, so every value but None is quoted.
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        value = 't' if value else 'f'
+    elif isinstance(value, list):
+        value = '{' + ','.join(
+            '"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"'
+            for item in value) + '}'
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_rows(table, rows):
+    """Load ``rows`` (dicts with the same keys) with Postgres COPY."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(
+            _copy_value(row[column]) for column in columns) + '\n')
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        'COPY "{}" ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            table.name, ', '.join('"{}"'.format(c) for c in columns)),
+        buffer)
+
+
+def insert_rows(table, rows, method='insert'):
+    if not rows:
+        return
+    if method == 'copy':
+        copy_rows(table, rows)
+    else:
+        db.session.execute(table.insert(), rows)
+
+
+def default_method():
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return 'copy'
+    return 'insert'
+
+
+class ImportReport:
+
+    def __init__(self, skipped=0):
+        self.imported = 0
+        self.processed = skipped
+        self.skipped = skipped
+        self.errors = []
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'processed': self.processed,
+            'skipped': self.skipped,
+            'errors': [
+                {'row': row, 'field': field, 'message': message}
+                for row, field, message in sorted(
+                    self.errors, key=lambda error: error[0])
+            ]
+        }
+
+
+def _missing_references(spec, batch):
+    # Unknown venue/artist ids would abort the whole batch on the foreign
+    # key, so look them up for the batch first and report them per row.
+    missing = []
+    for column, model in (('venue_id', Venue), ('artist_id', Artist)):
+        wanted = {values[column] for _, values in batch}
+        found = {id for id, in db.session.query(model.id).filter(
+            model.id.in_(wanted))}
+        for number, values in batch:
+            if values[column] not in found:
+                missing.append((number, column, 'No {} with id {}'.format(
+                    model.__name__.lower(), values[column])))
+    return missing
+
+
+def _insert_shows(batch, method, report):
+    # Load the batch in one go unless a row double-books a venue or artist;
+    # then roll the batch's transaction back and retry it row by row, each
+    # in its own savepoint, reporting the rows the exclusion constraints
+    # refuse. Returns the rows inserted.
+    if not batch:
+        return batch
+    table = Show.__table__
+    try:
+        insert_rows(table, [values for _, values in batch], method)
+    except Exception as e:
+        db.session.rollback()
+        if not is_booking_conflict(e):
+            raise
+    else:
+        return batch
+
+    inserted = []
+    for number, values in batch:
+        savepoint = db.session.begin_nested()
+        try:
+            insert_rows(table, [values])
+        except Exception as e:
+            savepoint.rollback()
+            if not is_booking_conflict(e):
+                raise
+            report.errors.append((
+                number, 'start_time',
+                'Overlaps another show at the venue or by the artist'))
+        else:
+            savepoint.commit()
+            inserted.append((number, values))
+    return inserted
+
+
+def import_rows(kind, rows, skip=0, batch_size=5000, method=None,
+                checkpoint=None):
+    """Validate and load ``rows`` from read_rows() in batches.
+
+    Every batch is committed on its own; after each commit ``checkpoint``
+    is called with the number of input rows processed so far, which can be
+    passed back as ``skip`` to resume an interrupted import.
+    """
+    spec = IMPORTS[kind]
+    method = method or default_method()
+    report = ImportReport(skip)
+    batch = []
+
+    def flush():
+        if spec.model is Show and batch:
+            missing = _missing_references(spec, batch)
+            if missing:
+                report.errors.extend(missing)
+                bad = {number for number, _, _ in missing}
+                batch[:] = [item for item in batch if item[0] not in bad]
+        if spec.model is Show:
+            batch[:] = _insert_shows(batch, method, report)
+        else:
+            insert_rows(spec.table, [values for _, values in batch], method)
+        if spec.model is Show and batch:
+            refresh_show_counters(
+                venue_ids={values['venue_id'] for _, values in batch},
+                artist_ids={values['artist_id'] for _, values in batch})
+        db.session.commit()
+        report.imported += len(batch)
+        batch.clear()
+        if checkpoint is not None:
+            checkpoint(report.processed)
+
+    for number, row in rows:
+        if number <= skip:
+            continue
+        report.processed = number
+        if row is None:
+            report.errors.append((number, None, 'Unreadable row'))
+            continue
+        values, errors = spec.validate(row)
+        if errors:
+            report.errors.extend(
+                (number, field, message) for field, message in errors)
+            continue
+        batch.append((number, values))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return report
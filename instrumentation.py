@@ -0,0 +1,86 @@
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ----------------------------------------------------------------------------#
+# Per-request SQL statement accounting.
+# ----------------------------------------------------------------------------#
+
+# During a request g.sql_statements counts each statement text run and
+# g.sql_time adds up the seconds spent executing them.
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit):
+    """Declare the most SQL statements a view may issue per request."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def _count_statement(conn, cursor, statement, parameters, context,
+                     executemany):
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements[statement] += 1
+        # The start time lives on the execution context, which belongs to
+        # this one statement; a statement that raises takes it along
+        # instead of leaving it behind on the pooled connection.
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+
+def _time_statement(conn, cursor, statement, parameters, context,
+                    executemany):
+    started = getattr(context, '_query_start', None)
+    if started is not None and has_request_context() and 'sql_time' in g:
+        g.sql_time += time.perf_counter() - started
+
+
+def _start_counting():
+    g.sql_statements = Counter()
+    g.sql_time = 0.0
+
+
+def _check_budget(response):
+    statements = g.get('sql_statements')
+    if statements is None:
+        return response
+    app = current_app._get_current_object()
+    total = sum(statements.values())
+
+    threshold = app.config['QUERY_REPEAT_THRESHOLD']
+    for statement, count in statements.items():
+        if count >= threshold:
+            app.logger.warning(
+                'Possible N+1 in %s: statement ran %d times: %s',
+                request.endpoint, count, statement)
+
+    view = app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    if budget is not None and total > budget:
+        message = '{} issued {} SQL statements, budget is {}'.format(
+            request.endpoint, total, budget)
+        strict = app.config['QUERY_BUDGET_RAISE']
+        if strict is None:
+            strict = app.testing
+        if strict:
+            raise QueryBudgetExceeded(message)
+        app.logger.warning(message)
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('QUERY_BUDGET_RAISE', None)
+    app.config.setdefault('QUERY_REPEAT_THRESHOLD', 3)
+    if not event.contains(Engine, 'before_cursor_execute', _count_statement):
+        event.listen(Engine, 'before_cursor_execute', _count_statement)
+        event.listen(Engine, 'after_cursor_execute', _time_statement)
+    app.before_request(_start_counting)
+    app.after_request(_check_budget)
@@ -0,0 +1,219 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+from datetime import datetime
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    WatchedFileHandler
+)
+
+# ----------------------------------------------------------------------------#
+# Non-blocking logging.
+# ----------------------------------------------------------------------------#
+
+# Request threads only put records on a bounded queue. A background listener
+# drains the queue in batches into the log file and flushes once per batch.
+# When the queue is full the record is dropped and counted instead of making
+# the request wait for the disk.
+#
+# With LOG_MAX_BYTES the file is rotated by size from inside the process.
+# That only works for one process: several gunicorn workers writing one
+# file would each rotate it on their own count and rename it from under
+# the others. With LOG_MAX_BYTES = 0 rotation is left to an external tool
+# such as logrotate, and the file is reopened once it has been moved.
+
+
+class DroppingQueueHandler(QueueHandler):
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare(), make the record safe to hand to
+        # another thread by resolving the message and the traceback, but
+        # keep the traceback in exc_text rather than in the message, so
+        # formatters still see it as the exception.
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            formatter = self.formatter or logging.Formatter()
+            record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that only flushes when flush_batch() is called.
+
+    RotatingFileHandler.shouldRollover() formats every record a second time
+    and seeks to the end of the file, which flushes the write buffer, so
+    the size of the file is tracked here from the records written instead.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        try:
+            self._size = os.path.getsize(self.baseFilename)
+        except OSError:
+            self._size = 0
+
+    def doRollover(self):
+        super().doRollover()
+        self._size = 0
+
+    def emit(self, record):
+        try:
+            message = self.format(record) + self.terminator
+            encoding = getattr(self.stream, 'encoding', None) or 'utf-8'
+            length = len(message.encode(encoding, 'replace'))
+            if 0 < self.maxBytes < self._size + length:
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(message)
+            self._size += length
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchedWatchedFileHandler(WatchedFileHandler):
+    """WatchedFileHandler that only flushes when flush_batch() is called.
+
+    Whether the file has been moved is checked once per batch rather than
+    once per record.
+    """
+
+    def emit(self, record):
+        logging.FileHandler.emit(self, record)
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+        self.reopenIfNeeded()
+
+
+class BatchingQueueListener(QueueListener):
+
+    def __init__(self, log_queue, *handlers, batch_size=500,
+                 flush_interval=1.0):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def _flush(self):
+        for handler in self.handlers:
+            getattr(handler, 'flush_batch', handler.flush)()
+
+    def _monitor(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [record]
+            while record is not self._sentinel and \
+                    len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(record)
+            for record in batch:
+                if record is self._sentinel:
+                    self._flush()
+                    return
+                self.handle(record)
+            self._flush()
+
+
+def _restart_after_fork(queue_handler, listener):
+    def restart():
+        # Only the forking thread survives in the child, so the listener
+        # thread is gone; give it a fresh queue and start it again.
+        log_queue = queue.Queue(queue_handler.queue.maxsize)
+        queue_handler.queue = listener.queue = log_queue
+        listener._thread = None
+        listener.start()
+    return restart
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'time': datetime.utcfromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'path': record.pathname,
+            'line': record.lineno,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry)
+
+
+TEXT_FORMAT = \
+    '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+
+
+def init_app(app):
+    app.config.setdefault('LOG_PATH', 'error.log')
+    app.config.setdefault('LOG_LEVEL', 'INFO')
+    app.config.setdefault('LOG_MAX_BYTES', 10 * 1024 * 1024)
+    app.config.setdefault('LOG_BACKUP_COUNT', 5)
+    app.config.setdefault('LOG_JSON', False)
+    app.config.setdefault('LOG_QUEUE_SIZE', 10000)
+
+    if app.config['LOG_MAX_BYTES']:
+        file_handler = BatchedRotatingFileHandler(
+            app.config['LOG_PATH'], maxBytes=app.config['LOG_MAX_BYTES'],
+            backupCount=app.config['LOG_BACKUP_COUNT'])
+    else:
+        file_handler = BatchedWatchedFileHandler(app.config['LOG_PATH'])
+    if app.config['LOG_JSON']:
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(app.config['LOG_QUEUE_SIZE'])
+    queue_handler = DroppingQueueHandler(log_queue)
+    listener = BatchingQueueListener(log_queue, file_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    os.register_at_fork(
+        after_in_child=_restart_after_fork(queue_handler, listener))
+
+    app.logger.setLevel(app.config['LOG_LEVEL'])
+    app.logger.addHandler(queue_handler)
+    app.extensions['logs'] = queue_handler
+
+
+def stats(app):
+    handler = app.extensions.get('logs')
+    if handler is None:
+        return None
+    return {'dropped': handler.dropped, 'queued': handler.queue.qsize()}
@@ -0,0 +1,74 @@
+import io
+
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    jsonify,
+    render_template,
+    request
+)
+
+import dbpool
+import importer
+import logs
+from cache import response_cache
+from instrumentation import query_budget
+from models import db, Artist, Show, Venue
+
+bp = Blueprint('main', __name__)
+
+
+@bp.route('/')
+@query_budget(0)
+def index():
+    return render_template('pages/home.html')
+
+
+#  Import
+#  ----------------------------------------------------------------
+
+def _invalidate_imported(kind):
+    if kind == 'shows':
+        response_cache.invalidate(Show, Venue, Artist)
+    else:
+        response_cache.invalidate(importer.IMPORTS[kind].model)
+
+
+@bp.route('/import/<any(venues, artists, shows):kind>', methods=['POST'])
+def import_data(kind):
+    upload = request.files.get('file')
+    if upload is None:
+        abort(400)
+    format = importer.import_format(
+        upload.filename, request.form.get('format'))
+    rows = importer.read_rows(
+        io.TextIOWrapper(upload.stream, encoding='utf-8'), format)
+    try:
+        report = importer.import_rows(
+            kind, rows,
+            skip=request.form.get('skip', 0, type=int),
+            batch_size=current_app.config['IMPORT_BATCH_SIZE'])
+    finally:
+        _invalidate_imported(kind)
+    return jsonify(report.to_dict())
+
+
+#  Metrics
+#  ----------------------------------------------------------------
+
+@bp.route('/_metrics')
+def metrics():
+    app = current_app._get_current_object()
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    writer = app.extensions.get('trace_writer')
+    return jsonify({
+        'response_cache': response_cache.stats(),
+        'db_pool': {
+            bind or 'primary': dbpool.stats(db.get_engine(app, bind))
+            for bind in [None] + app.config['SQLALCHEMY_REPLICA_BINDS']
+        },
+        'request_trace': writer.stats() if writer else None,
+        'logs': logs.stats(app)
+    })
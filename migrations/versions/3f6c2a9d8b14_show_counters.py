@@ -0,0 +1,50 @@
+"""add upcoming/past show counters to Venue and Artist
+
+Revision ID: 3f6c2a9d8b14
+Revises: a1426ed7c04a
+Create Date: 2026-10-18 19:02:11.204518
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c2a9d8b14'
+down_revision = 'a1426ed7c04a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column(
+            'upcoming_shows_count', sa.Integer(),
+            nullable=False, server_default='0'))
+        op.add_column(table, sa.Column(
+            'past_shows_count', sa.Integer(),
+            nullable=False, server_default='0'))
+
+    # Backfill the counters from the existing shows. Show.start_time is a
+    # naive local time and models.py splits upcoming from past with the
+    # app's datetime.now(), so the same clock is passed in here rather
+    # than using the database's now(), which is in the server's time zone.
+    now = datetime.now()
+    for table, column in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.execute(sa.text(
+            'UPDATE "{table}" SET '
+            'upcoming_shows_count = (SELECT count(*) FROM "Show" '
+            'WHERE "Show".{column} = "{table}".id '
+            'AND "Show".start_time > :now), '
+            'past_shows_count = (SELECT count(*) FROM "Show" '
+            'WHERE "Show".{column} = "{table}".id '
+            'AND "Show".start_time <= :now)'.format(
+                table=table, column=column)).bindparams(now=now))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
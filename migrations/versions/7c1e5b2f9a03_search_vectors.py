@@ -0,0 +1,67 @@
+"""add full-text and trigram search indexes to Venue and Artist
+
+Revision ID: 7c1e5b2f9a03
+Revises: 3f6c2a9d8b14
+Create Date: 2026-10-18 19:27:45.880391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e5b2f9a03'
+down_revision = '3f6c2a9d8b14'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_VECTOR = '''
+    setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+    setweight(to_tsvector('simple',
+        coalesce(NEW.city, '') || ' ' || coalesce(NEW.state, '')), 'B') ||
+    setweight(to_tsvector('simple',
+        coalesce(array_to_string(NEW.genres, ' '), '')), 'C')
+'''
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('Venue', 'Artist'):
+        lower = table.lower()
+        op.add_column(table, sa.Column(
+            'search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute('''
+            CREATE FUNCTION {lower}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        '''.format(lower=lower, vector=SEARCH_VECTOR))
+        op.execute('''
+            CREATE TRIGGER {lower}_search_vector_update
+            BEFORE INSERT OR UPDATE OF name, city, state, genres
+            ON "{table}"
+            FOR EACH ROW EXECUTE PROCEDURE {lower}_search_vector_update()
+        '''.format(lower=lower, table=table))
+        # Fire the trigger once for the existing rows.
+        op.execute('UPDATE "{}" SET name = name'.format(table))
+        op.create_index(
+            'ix_{}_search_vector'.format(lower), table, ['search_vector'],
+            postgresql_using='gin')
+        op.create_index(
+            'ix_{}_name_trgm'.format(lower), table, ['name'],
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        lower = table.lower()
+        op.drop_index('ix_{}_name_trgm'.format(lower), table_name=table)
+        op.drop_index('ix_{}_search_vector'.format(lower), table_name=table)
+        op.execute('DROP TRIGGER {lower}_search_vector_update ON "{table}"'
+                   .format(lower=lower, table=table))
+        op.execute('DROP FUNCTION {}_search_vector_update()'.format(lower))
+        op.drop_column(table, 'search_vector')
@@ -0,0 +1,42 @@
+"""make the Venue and Artist list sort keys NOT NULL
+
+Revision ID: a6d2e8f4c1b7
+Revises: f3a7c9e1d5b2
+Create Date: 2026-10-19 10:12:44.208913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2e8f4c1b7'
+down_revision = 'f3a7c9e1d5b2'
+branch_labels = None
+depends_on = None
+
+
+# (table, column) for every nullable column of the keys /venues and
+# /artists page through. A row comparison against a NULL is NULL, so such
+# a row dropped out of every page after the first. The forms always
+# required these fields; rows that still lack one get an empty string,
+# which sorts first.
+COLUMNS = [
+    ('Venue', 'city'),
+    ('Venue', 'state'),
+    ('Venue', 'name'),
+    ('Artist', 'name'),
+]
+
+
+def upgrade():
+    for table, column in COLUMNS:
+        op.execute(
+            'UPDATE "{table}" SET {column} = \'\' '
+            'WHERE {column} IS NULL'.format(table=table, column=column))
+        op.alter_column(table, column, nullable=False)
+
+
+def downgrade():
+    for table, column in reversed(COLUMNS):
+        op.alter_column(table, column, nullable=True)
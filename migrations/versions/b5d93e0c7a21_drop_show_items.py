@@ -0,0 +1,55 @@
+"""drop the show_items association in favour of the Show foreign keys
+
+Revision ID: b5d93e0c7a21
+Revises: e4b7d1c2a9f6
+Create Date: 2026-10-18 20:04:37.152846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d93e0c7a21'
+down_revision = 'e4b7d1c2a9f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fill in any Show foreign key that was only recorded in show_items.
+    op.execute('''
+        UPDATE "Show" SET
+            venue_id = coalesce("Show".venue_id, show_items.venue_id),
+            artist_id = coalesce("Show".artist_id, show_items.artist_id)
+        FROM show_items
+        WHERE show_items.show_id = "Show".id
+          AND ("Show".venue_id IS NULL OR "Show".artist_id IS NULL)
+    ''')
+    # The model has always required both. A show still missing one cannot
+    # be displayed, and makes this fail so it can be fixed by hand.
+    op.alter_column('Show', 'venue_id', existing_type=sa.Integer(),
+                    nullable=False)
+    op.alter_column('Show', 'artist_id', existing_type=sa.Integer(),
+                    nullable=False)
+    op.drop_table('show_items')
+
+
+def downgrade():
+    op.create_table(
+        'show_items',
+        sa.Column('venue_id', sa.Integer(), nullable=True),
+        sa.Column('show_id', sa.Integer(), nullable=True),
+        sa.Column('artist_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ),
+        sa.ForeignKeyConstraint(['show_id'], ['Show.id'], ),
+        sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    )
+    op.execute('''
+        INSERT INTO show_items (show_id, venue_id, artist_id)
+        SELECT id, venue_id, artist_id FROM "Show"
+    ''')
+    op.alter_column('Show', 'artist_id', existing_type=sa.Integer(),
+                    nullable=True)
+    op.alter_column('Show', 'venue_id', existing_type=sa.Integer(),
+                    nullable=True)
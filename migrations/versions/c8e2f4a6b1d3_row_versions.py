@@ -0,0 +1,33 @@
+"""add version and updated_at to Venue, Artist and Show
+
+Revision ID: c8e2f4a6b1d3
+Revises: b5d93e0c7a21
+Create Date: 2026-10-18 20:31:52.480119
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e2f4a6b1d3'
+down_revision = 'b5d93e0c7a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The server defaults fill in the existing rows; new values come from
+    # the models.
+    for table in ('Venue', 'Artist', 'Show'):
+        op.add_column(table, sa.Column(
+            'version', sa.Integer(), nullable=False, server_default='1'))
+        op.add_column(table, sa.Column(
+            'updated_at', sa.DateTime(), nullable=False,
+            server_default=sa.text("timezone('utc', now())")))
+
+
+def downgrade():
+    for table in ('Show', 'Artist', 'Venue'):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
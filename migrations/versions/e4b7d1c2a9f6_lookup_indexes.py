@@ -0,0 +1,45 @@
+"""index Show lookups by venue, artist and start time, and the list orders
+
+Revision ID: e4b7d1c2a9f6
+Revises: 7c1e5b2f9a03
+Create Date: 2026-10-18 19:52:08.613027
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7d1c2a9f6'
+down_revision = '7c1e5b2f9a03'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns). Each one backs a query in app.py: the profile
+# pages and counters look up shows by venue or artist and start time, and
+# the /shows, /venues and /artists pages page through these orders.
+INDEXES = [
+    ('ix_show_venue_id_start_time', 'Show', ['venue_id', 'start_time']),
+    ('ix_show_artist_id_start_time', 'Show', ['artist_id', 'start_time']),
+    ('ix_show_start_time_id', 'Show', ['start_time', 'id']),
+    ('ix_venue_city_state_name_id', 'Venue', ['city', 'state', 'name', 'id']),
+    ('ix_artist_name_id', 'Artist', ['name', 'id']),
+]
+
+
+# CREATE INDEX CONCURRENTLY does not block writes to the table, but cannot
+# run inside a transaction, hence the autocommit block. If it is
+# interrupted it leaves an INVALID index behind, which must be dropped
+# before running the upgrade again.
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns,
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=True)
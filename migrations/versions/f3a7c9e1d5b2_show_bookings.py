@@ -0,0 +1,62 @@
+"""add Show.duration and refuse overlapping bookings
+
+Revision ID: f3a7c9e1d5b2
+Revises: c8e2f4a6b1d3
+Create Date: 2026-10-18 22:04:37.912650
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a7c9e1d5b2'
+down_revision = 'c8e2f4a6b1d3'
+branch_labels = None
+depends_on = None
+
+BOOKED_PERIOD = \
+    "tsrange(start_time, start_time + duration * interval '1 minute')"
+
+
+def upgrade():
+    # btree_gist provides the GiST "=" on integers that the constraints
+    # pair with the range overlap.
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.add_column('Show', sa.Column(
+        'duration', sa.Integer(), nullable=False, server_default='120'))
+    # Shows booked before this revision may overlap. Cut each one short at
+    # the start of the next show at its venue or by its artist, so the
+    # constraints can be added without dropping anything; a show sharing
+    # its start time with another ends up with an empty period.
+    op.execute('''
+        UPDATE "Show" SET duration = least(
+            "Show".duration,
+            coalesce(next.venue_gap, "Show".duration),
+            coalesce(next.artist_gap, "Show".duration))
+        FROM (
+            SELECT id,
+                floor(extract(epoch FROM lead(start_time) OVER (
+                    PARTITION BY venue_id ORDER BY start_time, id
+                ) - start_time) / 60) AS venue_gap,
+                floor(extract(epoch FROM lead(start_time) OVER (
+                    PARTITION BY artist_id ORDER BY start_time, id
+                ) - start_time) / 60) AS artist_gap
+            FROM "Show"
+        ) AS next
+        WHERE next.id = "Show".id
+          AND (next.venue_gap < "Show".duration
+               OR next.artist_gap < "Show".duration)
+    ''')
+    for column in ('venue_id', 'artist_id'):
+        op.execute(
+            'ALTER TABLE "Show" ADD CONSTRAINT ex_show_{side}_booking '
+            'EXCLUDE USING gist ({column} WITH =, {period} WITH &&)'.format(
+                side=column[:-len('_id')], column=column,
+                period=BOOKED_PERIOD))
+
+
+def downgrade():
+    op.drop_constraint('ex_show_artist_booking', 'Show')
+    op.drop_constraint('ex_show_venue_booking', 'Show')
+    op.drop_column('Show', 'duration')
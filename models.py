@@ -1,50 +1,100 @@
-from flask_sqlalchemy import SQLAlchemy
+import re
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.postgresql import ExcludeConstraint, TSVECTOR
 
-db = SQLAlchemy()
+from routing import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
 
 # ----------------------------------------------------------------------------#
 # Models.
 # ----------------------------------------------------------------------------#
 
 
-show_items = db.Table(
-    'show_items', db.Column(
-        'show_id', db.Integer, db.ForeignKey('Show.id'), primary_key=True), db.Column(
-            'venue_id', db.Integer, db.ForeignKey('Venue.id'), primary_key=True), db.Column(
-                'artist_id', db.Integer, db.ForeignKey('Artist.id'), primary_key=True))
+# Server-side default of the updated_at columns, for rows written without
+# the ORM (COPY imports, the seed generator); matches migration c8e2f4a6b1d3.
+UTC_NOW = db.text("timezone('utc', now())")
+
+# Show lengths in minutes.
+DEFAULT_SHOW_DURATION = 120
+MAX_SHOW_DURATION = 24 * 60
+
+# The time a show holds its venue and artist. The exclusion constraints on
+# Show refuse two overlapping periods for one venue or one artist, and
+# booking_conflict() queries their GiST indexes through the same
+# expression.
+BOOKED_PERIOD = (
+    "tsrange(start_time, start_time + duration * interval '1 minute')")
 
 
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+        ExcludeConstraint(
+            (db.column('venue_id'), '='),
+            (db.literal_column(BOOKED_PERIOD), '&&'),
+            name='ex_show_venue_booking', using='gist'),
+        ExcludeConstraint(
+            (db.column('artist_id'), '='),
+            (db.literal_column(BOOKED_PERIOD), '&&'),
+            name='ex_show_artist_booking', using='gist'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime, nullable=False)
-    artist_id = db.Column(
+    duration = db.Column(db.Integer, nullable=False,
+                         default=DEFAULT_SHOW_DURATION,
+                         server_default=str(DEFAULT_SHOW_DURATION))
+    # active_history loads the replaced id when a show is moved, so the show
+    # counters of the venue or artist it leaves can be recounted too.
+    artist_id = db.column_property(db.Column(
         db.Integer,
         db.ForeignKey('Artist.id'),
-        nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
+        nullable=False), active_history=True)
+    venue_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False),
+        active_history=True)
+    version = db.Column(db.Integer, nullable=False, default=1,
+                        server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=UTC_NOW)
 
     venue = db.relationship('Venue')
     artist = db.relationship('Artist')
 
     def format(self):
         return {
+            'id': self.id,
             'venue_id': self.venue_id,
             'venue_name': self.venue.name,
             'artist_id': self.artist_id,
             'artist_name': self.artist.name,
             'artist_image_link': self.artist.image_link,
             'venue_image_link': self.venue.image_link,
-            'start_time': self.start_time.isoformat()
+            'start_time': self.start_time
         }
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_venue_search_vector', 'search_vector',
+                 postgresql_using='gin'),
+        db.Index('ix_venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venue_city_state_name_id',
+                 'city', 'state', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
-    city = db.Column(db.String(120))
-    state = db.Column(db.String(120))
+    name = db.Column(db.String, nullable=False)
+    city = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(120), nullable=False)
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
@@ -53,10 +103,27 @@ class Venue(db.Model):
     website = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    # Maintained by a database trigger from name, city, state and genres.
+    search_vector = db.Column(TSVECTOR)
+    # Bumped by every UPDATE of the row, including the counter updates made
+    # when one of its shows changes; the detail pages use them as HTTP
+    # validators.
+    version = db.Column(db.Integer, nullable=False, default=1,
+                        server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=UTC_NOW)
 
-    artists = db.relationship('Artist', secondary=show_items)
-    shows = db.relationship('Show', secondary=show_items, backref='venues')
-    venue_shows = db.relationship('Show')
+    # Shows are written through Show.venue_id / Show.venue; these are
+    # read-only views of the same foreign keys.
+    shows = db.relationship('Show', viewonly=True)
+    artists = db.relationship('Artist', secondary=Show.__table__,
+                              viewonly=True)
 
     def format(self):
         return {
@@ -77,9 +144,16 @@ class Venue(db.Model):
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_artist_search_vector', 'search_vector',
+                 postgresql_using='gin'),
+        db.Index('ix_artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artist_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String)
+    name = db.Column(db.String, nullable=False)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
@@ -89,10 +163,25 @@ class Artist(db.Model):
     website = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(120))
+    upcoming_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    # Maintained by a database trigger from name, city, state and genres.
+    search_vector = db.Column(TSVECTOR)
+    # Bumped by every UPDATE of the row, including the counter updates made
+    # when one of its shows changes; the detail pages use them as HTTP
+    # validators.
+    version = db.Column(db.Integer, nullable=False, default=1,
+                        server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+    updated_at = db.Column(db.DateTime, nullable=False,
+                           default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=UTC_NOW)
 
-    venues = db.relationship('Venue', secondary=show_items)
-    shows = db.relationship('Show', secondary=show_items, backref='artists')
-    artist_shows = db.relationship('Show')
+    shows = db.relationship('Show', viewonly=True)
+    venues = db.relationship('Venue', secondary=Show.__table__,
+                              viewonly=True)
 
     def format(self):
         return {
@@ -114,3 +203,350 @@ class Artist(db.Model):
             'id': self.id,
             'name': self.name
         }
+
+
+# ----------------------------------------------------------------------------#
+# Search.
+# ----------------------------------------------------------------------------#
+
+
+def _prefix_tsquery(term):
+    # Every word of the term must prefix-match a lexeme, so results narrow
+    # as the user types.
+    words = re.findall(r'[^\W_]+', term.lower())
+    return ' & '.join(word + ':*' for word in words)
+
+
+def search_query(model, term, limit):
+    """Rank ``model`` rows against ``term``.
+
+    Matches the full-text vector (name, city, state, genres), substrings of
+    the name and, through trigram similarity, misspelt names. All three are
+    served by the GIN indexes on Venue and Artist. The query yields up to
+    ``limit`` ``(row, total)`` pairs, best match first, where ``total`` is
+    the number of matches before the limit.
+    """
+    term = (term or '').strip()
+    total = db.func.count().over().label('total')
+    query = db.session.query(model, total)
+    if not term:
+        return query.order_by(model.name, model.id).limit(limit)
+
+    # Backslash is Postgres' default LIKE escape character.
+    pattern = '%{}%'.format(
+        term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+    conditions = [
+        model.name.ilike(pattern),
+        # pg_trgm's similarity operator is "%". Operator names are not
+        # escaped for psycopg2's pyformat parameters, so it is written
+        # doubled and reaches the server as a single "%".
+        model.name.op('%%')(term),
+    ]
+    rank = db.func.similarity(model.name, term)
+    prefix = _prefix_tsquery(term)
+    if prefix:
+        tsquery = db.func.to_tsquery('simple', prefix)
+        conditions.append(model.search_vector.op('@@')(tsquery))
+        rank = rank + db.func.ts_rank(model.search_vector, tsquery)
+    return query.filter(db.or_(*conditions)).order_by(
+        rank.desc(), model.id).limit(limit)
+
+
+def search(model, term, limit):
+    """Run search_query(); return its ``(row, total)`` pairs."""
+    return search_query(model, term, limit).all()
+
+
+# ----------------------------------------------------------------------------#
+# Show counters.
+# ----------------------------------------------------------------------------#
+
+# Venue and Artist carry denormalized upcoming/past show counts so list and
+# search pages never have to aggregate the Show table. They are kept in step
+# with every Show insert, update and delete below, and rolled over from
+# upcoming to past by refresh_show_counters() as start times pass.
+#
+# An insert just adds one to the bucket its start time falls in. An update
+# or delete cannot subtract the same way: a show that has started since the
+# last rollover is still counted as upcoming, so the bucket it is counted
+# in is not known. The venues and artists it touches are recounted in the
+# same flush instead, which also rolls them over.
+
+
+def _counter_column(start_time):
+    if start_time > datetime.now():
+        return 'upcoming_shows_count'
+    return 'past_shows_count'
+
+
+def _bump_show_counters(connection, venue_id, artist_id, start_time, delta):
+    column = _counter_column(start_time)
+    for model, entity_id in ((Venue, venue_id), (Artist, artist_id)):
+        if entity_id is None:
+            continue
+        table = model.__table__
+        connection.execute(
+            table.update()
+            .where(table.c.id == entity_id)
+            .values({column: table.c[column] + delta}))
+
+
+def _recount_statement(model, now):
+    shows = Show.__table__
+    _, foreign_key, _ = _profile_sides(model)
+    table = model.__table__
+    related = db.select([db.func.count()]).select_from(shows).where(
+        shows.c[foreign_key.key] == table.c.id)
+    return table.update().values(
+        upcoming_shows_count=related.where(
+            shows.c.start_time > now).as_scalar(),
+        past_shows_count=related.where(
+            shows.c.start_time <= now).as_scalar())
+
+
+def _recount_show_counters(connection, venue_ids, artist_ids):
+    now = datetime.now()
+    for model, ids in ((Venue, venue_ids), (Artist, artist_ids)):
+        ids = {entity_id for entity_id in ids if entity_id is not None}
+        if ids:
+            connection.execute(_recount_statement(model, now).where(
+                model.__table__.c.id.in_(ids)))
+
+
+def _previous_value(state, key):
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, key)
+
+
+@event.listens_for(Show, 'after_insert')
+def _count_inserted_show(mapper, connection, target):
+    _bump_show_counters(
+        connection, target.venue_id, target.artist_id, target.start_time, 1)
+
+
+@event.listens_for(Show, 'after_update')
+def _count_updated_show(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[key].history.has_changes()
+               for key in ('venue_id', 'artist_id', 'start_time')):
+        return
+    _recount_show_counters(
+        connection,
+        {_previous_value(state, 'venue_id'), target.venue_id},
+        {_previous_value(state, 'artist_id'), target.artist_id})
+
+
+@event.listens_for(Show, 'after_delete')
+def _count_deleted_show(mapper, connection, target):
+    state = inspect(target)
+    _recount_show_counters(
+        connection,
+        {_previous_value(state, 'venue_id')},
+        {_previous_value(state, 'artist_id')})
+
+
+def refresh_show_counters(since=None, venue_ids=None, artist_ids=None):
+    """Recount upcoming/past shows from the Show table.
+
+    With ``since`` only the venues and artists that have a show starting
+    between ``since`` and now are recounted, which is what the periodic
+    rollover needs. With ``venue_ids`` and/or ``artist_ids`` only those rows
+    are recounted. With none of them every row is recounted.
+    """
+    now = datetime.now()
+    shows = Show.__table__
+    targeted = venue_ids is not None or artist_ids is not None
+    for model, ids in ((Venue, venue_ids), (Artist, artist_ids)):
+        if targeted and not ids:
+            continue
+        table = model.__table__
+        _, foreign_key, _ = _profile_sides(model)
+        statement = _recount_statement(model, now)
+        if since is not None:
+            statement = statement.where(table.c.id.in_(
+                db.select([shows.c[foreign_key.key]]).where(
+                    shows.c.start_time.between(since, now))))
+        elif targeted:
+            statement = statement.where(table.c.id.in_(list(ids)))
+        db.session.execute(statement)
+    db.session.commit()
+
+
+# ----------------------------------------------------------------------------#
+# Bookings.
+# ----------------------------------------------------------------------------#
+
+EXCLUSION_VIOLATION = '23P01'
+
+
+def booking_conflict(venue_id, artist_id, start_time, duration):
+    """The earliest show at the venue or by the artist overlapping a slot.
+
+    Probes the GiST indexes behind the exclusion constraints, so the cost
+    grows with the log of the number of shows booked, not with the size
+    of the venue's or artist's schedule. Returns None when the slot is
+    free.
+    """
+    wanted = db.func.tsrange(
+        start_time, start_time + timedelta(minutes=duration))
+    return Show.query.filter(
+        db.or_(Show.venue_id == venue_id, Show.artist_id == artist_id),
+        db.literal_column(BOOKED_PERIOD).op('&&')(wanted)
+    ).order_by(Show.start_time, Show.id).first()
+
+
+def is_booking_conflict(error):
+    """Whether ``error`` is a double booking refused by the database.
+
+    Accepts DBAPI errors as well as SQLAlchemy's wrappers of them.
+    """
+    error = getattr(error, 'orig', error)
+    return getattr(error, 'pgcode', None) == EXCLUSION_VIOLATION
+
+
+# ----------------------------------------------------------------------------#
+# Profile shows.
+# ----------------------------------------------------------------------------#
+
+# The types of the (start_time, id) ``before`` cursor of profile_shows().
+PROFILE_SHOWS_CURSOR = (datetime, int)
+
+
+def _profile_sides(model):
+    """(other model, foreign key to ``model``, foreign key to other)."""
+    if model is Venue:
+        return Artist, Show.venue_id, Show.artist_id
+    return Venue, Show.artist_id, Show.venue_id
+
+
+def _show_bucket(name, model, entity_id, limit, upcoming, now, before):
+    _, foreign_key, other_key = _profile_sides(model)
+    if upcoming:
+        condition = Show.start_time > now
+        order = [Show.start_time, Show.id]
+    else:
+        condition = Show.start_time <= now
+        order = [Show.start_time.desc(), Show.id.desc()]
+    if before is not None:
+        condition = db.and_(condition, db.tuple_(Show.start_time, Show.id)
+                            < db.tuple_(*before))
+    # Counted in a subquery rather than with count(*) OVER (), so it is an
+    # index-only scan of (foreign key, start_time) instead of reading every
+    # show in the bucket.
+    total = db.select([db.func.count()]).select_from(Show.__table__).where(
+        db.and_(foreign_key == entity_id, condition))
+    query = db.select([
+        db.literal(name).label('bucket'),
+        total.as_scalar().label('total'),
+        Show.id,
+        Show.start_time,
+        other_key.label('other_id'),
+    ]).where(foreign_key == entity_id).where(condition).order_by(*order)
+    return db.select([query.limit(limit).alias()])
+
+
+def profile_shows(model, entity_id, limit, before=None):
+    """The shows listed on a venue or artist page, in one statement.
+
+    Returns ``{'upcoming': (shows, count), 'past': (shows, count)}`` with
+    at most ``limit`` shows per bucket, the soonest upcoming and the latest
+    past first, and each bucket's full size. Shows are dicts of the show's
+    id and start_time and the other side's id, name and image_link, keyed
+    like Show.format(). With ``before``, a (start_time, id) cursor, only
+    the past shows older than it are read, and counted.
+    """
+    other, _, _ = _profile_sides(model)
+    now = datetime.now()
+    buckets = [_show_bucket('past', model, entity_id, limit, False, now,
+                            before)]
+    if before is None:
+        buckets.append(_show_bucket('upcoming', model, entity_id, limit,
+                                    True, now, None))
+    shows = db.union_all(*buckets).alias()
+    rows = db.session.query(
+        shows.c.bucket,
+        shows.c.total,
+        shows.c.id,
+        shows.c.start_time,
+        other.id,
+        other.name,
+        other.image_link,
+    ).select_from(shows).join(other, other.id == shows.c.other_id).all()
+
+    prefix = other.__tablename__.lower()
+    result = {'upcoming': ([], 0), 'past': ([], 0)}
+    for bucket, total, *show in rows:
+        result[bucket] = (result[bucket][0], total)
+        result[bucket][0].append(dict(zip(
+            ('id', 'start_time', prefix + '_id', prefix + '_name',
+             prefix + '_image_link'), show)))
+    # The join does not keep the order of the subqueries.
+    result['upcoming'][0].sort(key=lambda show: (show['start_time'],
+                                                 show['id']))
+    result['past'][0].sort(key=lambda show: (show['start_time'], show['id']),
+                           reverse=True)
+    return result
+
+# ----------------------------------------------------------------------------#
+# Page validators.
+# ----------------------------------------------------------------------------#
+
+
+# A venue or artist row's version and updated_at move whenever its page
+# would change: on edits to the row itself; through the counter updates
+# above, whenever one of its shows is added, moved or removed; and through
+# _touch_show_partners() below, whenever the name or image of a venue or
+# artist it shares a show with changes. So its page validators never have
+# to read its shows.
+
+PARTNER_FIELDS = ('name', 'image_link')
+
+
+def _touch_show_partners(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[key].history.has_changes()
+               for key in PARTNER_FIELDS):
+        return
+    other, foreign_key, other_key = _profile_sides(type(target))
+    table = other.__table__
+    connection.execute(
+        table.update()
+        .where(table.c.id.in_(
+            db.select([other_key]).where(foreign_key == target.id)))
+        .values(version=table.c.version + 1))
+
+
+event.listen(Venue, 'after_update', _touch_show_partners)
+event.listen(Artist, 'after_update', _touch_show_partners)
+
+
+def profile_state(model, entity_id):
+    """Everything a venue or artist page depends on, in one cheap query.
+
+    Returns None if there is no such row, else a tuple that changes
+    whenever the rendered page would: the row's version and updated_at,
+    and the start of its latest show that has begun, which moves the
+    past/upcoming split as time passes. That start is a single descending
+    probe of the (foreign key, start_time) index, so revalidating a page
+    costs the same however many shows it has. Also returns when the page
+    last changed, as naive UTC.
+    """
+    _, foreign_key, _ = _profile_sides(model)
+    started = db.select([db.func.max(Show.start_time)]).where(
+        db.and_(foreign_key == entity_id,
+                Show.start_time <= datetime.now())).as_scalar()
+    row = db.session.query(
+        model.version,
+        model.updated_at,
+        started,
+    ).filter(model.id == entity_id).one_or_none()
+    if row is None:
+        return None
+    _, updated_at, passed = row
+    # Show start times are local; updated_at is UTC.
+    changes = [updated_at]
+    if passed is not None:
+        changes.append(passed.astimezone(timezone.utc).replace(tzinfo=None))
+    return tuple(row), max(changes)
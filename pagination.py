@@ -0,0 +1,139 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request, url_for
+from sqlalchemy import tuple_
+
+# ----------------------------------------------------------------------------#
+# Keyset pagination.
+# ----------------------------------------------------------------------------#
+
+# Pages are addressed by the sort key of the row at the edge of the previous
+# page (?after=<cursor> / ?before=<cursor>) rather than by an offset, so the
+# database seeks straight to the page through the ordering index and deep
+# pages cost the same as the first one.
+
+
+def encode_cursor(values):
+    values = [
+        {'dt': value.isoformat()} if isinstance(value, datetime) else value
+        for value in values]
+    payload = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, types=None):
+    """Decode ``cursor``, aborting with 400 if it is malformed.
+
+    With ``types`` the cursor must hold one value of each type, in order.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(payload.decode('utf-8'))
+        if not isinstance(values, list):
+            raise ValueError(cursor)
+        values = [
+            datetime.fromisoformat(value['dt'])
+            if isinstance(value, dict) else value
+            for value in values]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        abort(400)
+    if types is not None:
+        check_cursor(values, types)
+    return values
+
+
+def check_cursor(values, types):
+    """Abort with 400 unless ``values`` match ``types`` one to one."""
+    if len(values) != len(types):
+        abort(400)
+    for value, type_ in zip(values, types):
+        # bool is an int to isinstance() but never a valid key value.
+        if isinstance(value, bool) or not isinstance(value, type_):
+            abort(400)
+
+
+class KeysetPage:
+
+    def __init__(self, items, next_cursor, prev_cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+
+    def _url(self, **cursor):
+        args = request.args.to_dict()
+        args.pop('after', None)
+        args.pop('before', None)
+        args.update(request.view_args or {})
+        args.update(cursor)
+        return url_for(request.endpoint, **args)
+
+    @property
+    def next_url(self):
+        if self.next_cursor is not None:
+            return self._url(after=self.next_cursor)
+
+    @property
+    def prev_url(self):
+        if self.prev_cursor is not None:
+            return self._url(before=self.prev_cursor)
+
+
+def page_args():
+    """Read the cursor and page size of the current request."""
+    after = request.args.get('after')
+    before = request.args.get('before')
+    per_page = request.args.get(
+        'per_page', current_app.config['PAGE_SIZE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['MAX_PAGE_SIZE']))
+    return (
+        decode_cursor(after) if after else None,
+        decode_cursor(before) if before else None,
+        per_page)
+
+
+def keyset_paginate(query, columns, key, after=None, before=None,
+                    per_page=50):
+    """Return one page of ``query`` ordered by ``columns``.
+
+    ``columns`` must form a unique sort key (end it with the primary key)
+    of NOT NULL columns, since a row comparison with a NULL is never true,
+    and ``key`` maps a result row to its values for those columns.
+    Cursors that do not fit ``columns`` abort with 400.
+    """
+    types = [column.type.python_type for column in columns]
+    for cursor in (after, before):
+        if cursor is not None:
+            check_cursor(cursor, types)
+    if before is not None:
+        query = query.filter(tuple_(*columns) < tuple_(*before))
+        query = query.order_by(*[column.desc() for column in columns])
+    else:
+        if after is not None:
+            query = query.filter(tuple_(*columns) > tuple_(*after))
+        query = query.order_by(*columns)
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before is not None:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after is not None
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(key(rows[-1]))
+    if rows and has_prev:
+        prev_cursor = encode_cursor(key(rows[0]))
+    return KeysetPage(rows, next_cursor, prev_cursor, per_page)
+
+
+def more_cursor(items, total, key):
+    """Cursor past the last of ``items`` when ``total`` says more follow."""
+    if items and total > len(items):
+        return encode_cursor(key(items[-1]))
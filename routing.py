@@ -0,0 +1,103 @@
+import random
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import event, orm
+
+# ----------------------------------------------------------------------------#
+# Read replica routing.
+# ----------------------------------------------------------------------------#
+
+# Read-only requests send their queries to one of the binds listed in
+# SQLALCHEMY_REPLICA_BINDS, picked once per request. A request is read-only
+# when it is a GET or HEAD, or when its view is marked @read_only. Anything
+# else, anything outside a request, and anything after the session has
+# written (a flush or a bulk update/delete) uses the primary. So does any
+# request that called use_primary(), as the response cache does before
+# rendering a page it is going to store.
+#
+# For read-your-writes, a commit during a request stores a deadline in the
+# user's session. Until that deadline passes, that user's reads also go to
+# the primary. This means the page after a redirect never shows data older
+# than the write just made.
+
+READ_METHODS = frozenset(('GET', 'HEAD'))
+
+
+def read_only(view):
+    """Let a non-GET view (e.g. a search form POST) read from a replica."""
+    view.read_only = True
+    return view
+
+
+def use_primary():
+    """Send the rest of this request's reads to the primary."""
+    g.db_read_bind = None
+
+
+def _choose_replica(app):
+    replicas = app.config['SQLALCHEMY_REPLICA_BINDS']
+    if not replicas:
+        return None
+    view = app.view_functions.get(request.endpoint)
+    if request.method not in READ_METHODS and \
+            not getattr(view, 'read_only', False):
+        return None
+    if session.get('db_primary_until', 0) > time.time():
+        return None
+    return random.choice(replicas)
+
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or self.info.get('wrote') or \
+                not has_request_context():
+            return super().get_bind(mapper, clause)
+        if mapper is not None and \
+                mapper.persist_selectable.info.get('bind_key') is not None:
+            return super().get_bind(mapper, clause)
+        if 'db_read_bind' not in g:
+            g.db_read_bind = _choose_replica(self.app)
+        if g.db_read_bind is None:
+            return super().get_bind(mapper, clause)
+        return get_state(self.app).db.get_engine(self.app,
+                                                 bind=g.db_read_bind)
+
+
+def _mark_written(db_session, flush_context):
+    db_session.info['wrote'] = True
+
+
+def _mark_bulk_written(context):
+    context.session.info['wrote'] = True
+
+
+def _stick_to_primary(db_session):
+    if db_session.info.pop('wrote', False) and has_request_context():
+        window = db_session.app.config['READ_YOUR_WRITES_SECONDS']
+        session['db_primary_until'] = time.time() + window
+
+
+def _forget_writes(db_session):
+    db_session.info.pop('wrote', None)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def init_app(self, app):
+        app.config.setdefault('SQLALCHEMY_REPLICA_BINDS', [])
+        app.config.setdefault('READ_YOUR_WRITES_SECONDS', 5)
+        super().init_app(app)
+        if not event.contains(RoutingSession, 'after_flush', _mark_written):
+            event.listen(RoutingSession, 'after_flush', _mark_written)
+            event.listen(RoutingSession, 'after_bulk_update',
+                         _mark_bulk_written)
+            event.listen(RoutingSession, 'after_bulk_delete',
+                         _mark_bulk_written)
+            event.listen(RoutingSession, 'after_commit', _stick_to_primary)
+            event.listen(RoutingSession, 'after_rollback', _forget_writes)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
@@ -0,0 +1,237 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from forms import VenueForm
+from importer import default_method, insert_rows
+from models import db, Artist, Venue, Show, refresh_show_counters
+
+# ----------------------------------------------------------------------------#
+# Synthetic datasets.
+# ----------------------------------------------------------------------------#
+
+# Everything is drawn from one random.Random(seed), so the same seed, sizes
+# and anchor date always produce the same rows. Distributions are skewed the
+# way real listings are: a few big cities hold most venues and artists, a
+# few venues and artists play most shows, and most shows are in the past.
+# No two shows overlap at a venue or for an artist, as the Show exclusion
+# constraints require.
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'),
+    ('Houston', 'TX'), ('Phoenix', 'AZ'), ('Philadelphia', 'PA'),
+    ('San Antonio', 'TX'), ('San Diego', 'CA'), ('Dallas', 'TX'),
+    ('San Francisco', 'CA'), ('Austin', 'TX'), ('Seattle', 'WA'),
+    ('Denver', 'CO'), ('Washington', 'DC'), ('Boston', 'MA'),
+    ('Nashville', 'TN'), ('Detroit', 'MI'), ('Portland', 'OR'),
+    ('Las Vegas', 'NV'), ('Memphis', 'TN'), ('Atlanta', 'GA'),
+    ('Miami', 'FL'), ('Minneapolis', 'MN'), ('New Orleans', 'LA'),
+    ('Cleveland', 'OH'), ('Pittsburgh', 'PA'), ('Salt Lake City', 'UT'),
+    ('Kansas City', 'MO'), ('Raleigh', 'NC'), ('Richmond', 'VA'),
+]
+GENRES = [value for value, _ in vars(VenueForm)['genres'].kwargs['choices']]
+ADJECTIVES = [
+    'Blue', 'Golden', 'Velvet', 'Electric', 'Midnight', 'Rusty', 'Silver',
+    'Wild', 'Crimson', 'Lucky', 'Hidden', 'Neon', 'Old', 'Little', 'Grand',
+]
+NOUNS = [
+    'Room', 'Hall', 'Tavern', 'Lounge', 'Garage', 'Barn', 'Cellar',
+    'Theatre', 'Club', 'Ballroom', 'Owl', 'Fox', 'Horses', 'Engines',
+    'Lanterns', 'Machines', 'Rivers', 'Saints',
+]
+
+PAST_SHOW_RATIO = 0.7
+PAST_DAYS = 3 * 365
+UPCOMING_DAYS = 180
+
+# Shows start on the half hour between 18:00 and 23:30 and run for one of
+# DURATIONS minutes, so they end by 02:30 and can only overlap shows of the
+# same evening. Days are generated one at a time, keeping just that day's
+# bookings. A show whose venue or artist is still busy after
+# PLACEMENT_ATTEMPTS draws of a time gets another venue and artist.
+SLOT_MINUTES = 30
+EVENING_SLOTS = range(18 * 60 // SLOT_MINUTES, 24 * 60 // SLOT_MINUTES)
+DURATIONS = (60, 90, 120, 120, 150, 180)
+MAX_SLOTS = max(DURATIONS) // SLOT_MINUTES
+PLACEMENT_ATTEMPTS = 20
+MAX_PAIRS = 100
+
+
+def _zipf_weights(count, exponent=1.1):
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+class Generator:
+
+    def __init__(self, seed=0, anchor=None):
+        self.rng = random.Random(seed)
+        self.anchor = anchor or datetime.combine(
+            datetime.today(), datetime.min.time())
+        self.city_weights = _zipf_weights(len(CITIES))
+        self.genre_weights = _zipf_weights(len(GENRES), 0.8)
+
+    def _name(self, index):
+        return '{} {} {}'.format(self.rng.choice(ADJECTIVES),
+                                 self.rng.choice(NOUNS), index)
+
+    def _genres(self):
+        count = self.rng.choices((1, 2, 3), weights=(5, 3, 1))[0]
+        return sorted(set(self.rng.choices(
+            GENRES, cum_weights=self.genre_weights, k=count)))
+
+    def _profile(self, index, slug):
+        city, state = self.rng.choices(
+            CITIES, cum_weights=self.city_weights)[0]
+        return {
+            'name': self._name(index),
+            'city': city,
+            'state': state,
+            'phone': '{:03d}-{:03d}-{:04d}'.format(
+                self.rng.randrange(200, 999), self.rng.randrange(1000),
+                self.rng.randrange(10000)),
+            'genres': self._genres(),
+            'image_link': 'https://picsum.photos/seed/{}{}/300'.format(
+                slug, index),
+            'facebook_link': 'https://www.facebook.com/{}{}'.format(
+                slug, index),
+            'website': 'https://{}{}.example.com'.format(slug, index),
+            'seeking_description': None,
+        }
+
+    def venue(self, index):
+        row = self._profile(index, 'venue')
+        row['address'] = '{} {} St'.format(
+            self.rng.randrange(1, 9999), self.rng.choice(NOUNS))
+        row['seeking_talent'] = self.rng.random() < 0.3
+        return row
+
+    def artist(self, index):
+        row = self._profile(index, 'artist')
+        row['seeking_venue'] = self.rng.random() < 0.4
+        return row
+
+    def _day_counts(self, count):
+        # PAST_SHOW_RATIO of the shows fall on the days before the anchor,
+        # the rest on the days from it, spread evenly over each range.
+        past = round(count * PAST_SHOW_RATIO)
+        days = {}
+        for span, total in ((range(1 - PAST_DAYS, 0), past),
+                            (range(UPCOMING_DAYS), count - past)):
+            base, extra = divmod(total, len(span))
+            for day in span:
+                days[day] = base
+            for day in self.rng.sample(span, extra):
+                days[day] += 1
+        return sorted(days.items())
+
+    def shows(self, count, venue_ids, artist_ids):
+        """Yield exactly ``count`` shows, day by day."""
+        # Popularity follows a Pareto tail, so a small share of venues and
+        # artists account for most shows.
+        venue_weights = list(accumulate(
+            self.rng.paretovariate(1.5) for _ in venue_ids))
+        artist_weights = list(accumulate(
+            self.rng.paretovariate(1.5) for _ in artist_ids))
+
+        def pairs(size):
+            return zip(
+                self.rng.choices(venue_ids, cum_weights=venue_weights,
+                                 k=size),
+                self.rng.choices(artist_ids, cum_weights=artist_weights,
+                                 k=size))
+
+        for day, size in self._day_counts(count):
+            # Booked slots of the day per venue and per artist:
+            # {first slot: length}.
+            venue_slots = defaultdict(dict)
+            artist_slots = defaultdict(dict)
+            for pair in pairs(size):
+                for _ in range(MAX_PAIRS):
+                    show = self._show(day, *pair, venue_slots, artist_slots)
+                    if show is not None:
+                        yield show
+                        break
+                    pair, = pairs(1)
+                else:
+                    raise ValueError(
+                        'Too many shows for the venues and artists: no free '
+                        'slot left on day {}'.format(day))
+
+    @staticmethod
+    def _free(booked, start, length):
+        # Only shows starting less than MAX_SLOTS before ``start`` can
+        # still be running at ``start``.
+        for slot in range(start - MAX_SLOTS + 1, start + length):
+            if slot in booked and slot + booked[slot] > start:
+                return False
+        return True
+
+    def _show(self, day, venue_id, artist_id, venue_slots, artist_slots):
+        venue_slots = venue_slots[venue_id]
+        artist_slots = artist_slots[artist_id]
+        for _ in range(PLACEMENT_ATTEMPTS):
+            start = self.rng.choice(EVENING_SLOTS)
+            duration = self.rng.choice(DURATIONS)
+            length = duration // SLOT_MINUTES
+            if self._free(venue_slots, start, length) and \
+                    self._free(artist_slots, start, length):
+                venue_slots[start] = artist_slots[start] = length
+                return {
+                    'venue_id': venue_id,
+                    'artist_id': artist_id,
+                    'start_time': self.anchor + timedelta(
+                        days=day, minutes=start * SLOT_MINUTES),
+                    'duration': duration,
+                }
+        return None
+
+
+def _insert_batched(table, rows, batch_size, method, echo):
+    batch = []
+    inserted = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            insert_rows(table, batch, method)
+            db.session.commit()
+            inserted += len(batch)
+            echo('  {} {}'.format(inserted, table.name))
+            batch = []
+    insert_rows(table, batch, method)
+    db.session.commit()
+    return inserted + len(batch)
+
+
+def _new_ids(model, after):
+    return [id for id, in db.session.query(model.id).filter(
+        model.id > after).order_by(model.id)]
+
+
+def seed(venues, artists, shows, seed=0, anchor=None, batch_size=50000,
+         method=None, echo=lambda message: None):
+    """Add a synthetic dataset of the given size to the database."""
+    generator = Generator(seed, anchor)
+    method = method or default_method()
+    last_venue = db.session.query(db.func.max(Venue.id)).scalar() or 0
+    last_artist = db.session.query(db.func.max(Artist.id)).scalar() or 0
+
+    echo('Venues')
+    _insert_batched(Venue.__table__,
+                    (generator.venue(i) for i in range(1, venues + 1)),
+                    batch_size, method, echo)
+    echo('Artists')
+    _insert_batched(Artist.__table__,
+                    (generator.artist(i) for i in range(1, artists + 1)),
+                    batch_size, method, echo)
+    if shows:
+        echo('Shows')
+        inserted = _insert_batched(
+            Show.__table__,
+            generator.shows(shows, _new_ids(Venue, last_venue),
+                            _new_ids(Artist, last_artist)),
+            batch_size, method, echo)
+        echo('{} shows added'.format(inserted))
+    echo('Counters')
+    refresh_show_counters()
@@ -0,0 +1,248 @@
+from datetime import date, datetime, time, timedelta
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    flash,
+    jsonify,
+    render_template,
+    request,
+    stream_with_context,
+    url_for
+)
+from sqlalchemy.exc import IntegrityError
+
+import export
+from cache import response_cache
+from forms import ShowForm
+from instrumentation import query_budget
+from models import (
+    db,
+    Artist,
+    Show,
+    Venue,
+    booking_conflict,
+    is_booking_conflict
+)
+from pagination import keyset_paginate, page_args
+
+bp = Blueprint('shows', __name__)
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        abort(400)
+    # Show times are naive wall-clock times and cannot be compared with an
+    # offset-aware one.
+    if moment.tzinfo is not None:
+        abort(400)
+    return moment
+
+
+def _end_arg(name):
+    # A bare date as the end of a range includes that whole day, so
+    # ?from=2020-06-19&to=2020-06-21 covers the weekend.
+    end = _date_arg(name)
+    if end is not None and len(request.args[name]) == len('YYYY-MM-DD'):
+        end += timedelta(days=1)
+    return end
+
+
+def _filtered_shows(start=None, end=None):
+    """Shows starting in [start, end), narrowed by ?venue_id= and ?city=.
+
+    The window is a pair of range predicates on Show.start_time, so the
+    start_time indexes read only the shows inside it, however many shows
+    there are in total.
+    """
+    query = Show.query.options(
+        db.joinedload(Show.venue),
+        db.joinedload(Show.artist)
+    )
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end)
+    venue_id = request.args.get('venue_id', type=int)
+    if venue_id is not None:
+        query = query.filter(Show.venue_id == venue_id)
+    city = request.args.get('city', '').strip()
+    if city:
+        # A subquery instead of a join leaves the joinedloads alone; the
+        # city's venues come from ix_venue_city_state_name_id and their
+        # shows from ix_show_venue_id_start_time.
+        query = query.filter(Show.venue_id.in_(
+            db.session.query(Venue.id).filter(Venue.city == city)))
+    return query
+
+
+@bp.route('/shows')
+@query_budget(1)
+@response_cache.cached(Show, Venue, Artist)
+def shows():
+    after, before, per_page = page_args()
+    query = _filtered_shows(_date_arg('from'), _end_arg('to'))
+    page = keyset_paginate(
+        query,
+        [Show.start_time, Show.id],
+        key=lambda show: (show.start_time, show.id),
+        after=after, before=before, per_page=per_page)
+    data = [s.format() for s in page.items]
+    return render_template('pages/shows.html', shows=data, page=page)
+
+
+def _calendar_window():
+    """The (start, end) the calendar shows; by default from today on."""
+    config = current_app.config
+    start = _date_arg('from') or datetime.combine(date.today(), time.min)
+    end = _end_arg('to') or start + timedelta(days=config['CALENDAR_DAYS'])
+    if not start < end <= start + timedelta(
+            days=config['CALENDAR_MAX_DAYS']):
+        abort(400)
+    return start, end
+
+
+def _calendar():
+    """Bucket the shows of the requested window by day.
+
+    Returns (start, end, [(date, shows)], truncated); every day of the
+    window is listed, with or without shows.
+    """
+    config = current_app.config
+    start, end = _calendar_window()
+
+    limit = config['CALENDAR_MAX_SHOWS']
+    rows = _filtered_shows(start, end).order_by(
+        Show.start_time, Show.id).limit(limit + 1).all()
+    truncated = len(rows) > limit
+
+    days = {}
+    day = start.date()
+    while datetime.combine(day, time.min) < end:
+        days[day] = []
+        day += timedelta(days=1)
+    for show in rows[:limit]:
+        days[show.start_time.date()].append(show.format())
+    return start, end, list(days.items()), truncated
+
+
+@bp.route('/shows/calendar')
+@query_budget(1)
+# Without ?from= the window starts today, so the key carries the window
+# and a page cached yesterday is not served after midnight.
+@response_cache.cached(Show, Venue, Artist, vary=_calendar_window)
+def calendar():
+    start, end, days, truncated = _calendar()
+    args = request.args.to_dict()
+    span = end - start
+    args.update({'from': (start - span).isoformat(), 'to': start.isoformat()})
+    prev_url = url_for('shows.calendar', **args)
+    args.update({'from': end.isoformat(), 'to': (end + span).isoformat()})
+    next_url = url_for('shows.calendar', **args)
+    return render_template(
+        'pages/calendar.html', days=days, truncated=truncated,
+        prev_url=prev_url, next_url=next_url)
+
+
+@bp.route('/shows/calendar.json')
+@query_budget(1)
+def calendar_json():
+    start, end, days, truncated = _calendar()
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'truncated': truncated,
+        'days': [{
+            'date': day.isoformat(),
+            'shows': [
+                dict(show, start_time=show['start_time'].isoformat())
+                for show in shows],
+        } for day, shows in days],
+    })
+
+
+@bp.route('/shows/export.<any(ndjson, csv):format>')
+def export_shows(format):
+    rows = export.show_rows(
+        start=_date_arg('from'),
+        end=_end_arg('to'),
+        venue_id=request.args.get('venue_id', type=int))
+    serialize, mimetype = export.FORMATS[format]
+    return Response(
+        stream_with_context(serialize(rows)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition':
+                'attachment; filename=shows.{}'.format(format)
+        })
+
+
+@bp.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+def _conflict_message(conflict, venue_id):
+    if conflict is None:
+        return 'That time overlaps another show at the venue or by the artist.'
+    end = conflict.start_time + timedelta(minutes=conflict.duration)
+    if str(conflict.venue_id) == str(venue_id):
+        who = 'Venue {} is already booked'.format(conflict.venue_id)
+    else:
+        who = 'Artist {} is already playing'.format(conflict.artist_id)
+    return '{} from {:%Y-%m-%d %H:%M} to {:%H:%M}; pick another time.'.format(
+        who, conflict.start_time, end)
+
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    form = ShowForm(request.form, meta={'csrf': False})
+    if form.validate():
+        booking = {
+            'start_time': form.start_time.data,
+            'duration': form.duration.data,
+            'artist_id': form.artist_id.data,
+            'venue_id': form.venue_id.data,
+        }
+        # Checked up front for a helpful message; the exclusion constraints
+        # still catch a booking that races this one.
+        conflict = booking_conflict(**booking)
+        booked = conflict is None
+        if booked:
+            try:
+                show = Show(**booking)
+                db.session.add(show)
+                db.session.commit()
+            except ValueError as e:
+                print(e)
+                db.session.rollback()
+            except IntegrityError as e:
+                db.session.rollback()
+                if not is_booking_conflict(e):
+                    raise
+                booked = False
+                conflict = booking_conflict(**booking)
+            finally:
+                db.session.close()
+        if booked:
+            flash('Requested show was successfully listed')
+            return render_template('pages/home.html')
+        flash(_conflict_message(conflict, booking['venue_id']))
+        return render_template('forms/new_show.html', form=form), 409
+    else:
+        message = []
+        for field, errors in form.errors.items():
+            for error in errors:
+                message.append(f"{field}: {error}")
+        flash('Please fix the following errors: ' + ", ".join(message))
+        form = ShowForm()
+        return render_template('forms/new_show.html', form=form)
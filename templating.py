@@ -0,0 +1,35 @@
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+# ----------------------------------------------------------------------------#
+# Template compilation.
+# ----------------------------------------------------------------------------#
+
+# Compiled templates are kept on disk in TEMPLATE_CACHE_DIR. Every worker
+# loads them from there instead of parsing and compiling the sources again.
+# `flask precompile-templates` fills the directory at deploy time. With
+# TEMPLATES_PRELOAD every template is also loaded when the app is created;
+# under a preloading server this happens once in the master, and the forked
+# workers start with them already in memory.
+
+
+def template_names(app):
+    return app.jinja_env.list_templates(extensions=['html'])
+
+
+def precompile(app):
+    """Load (compiling and caching, if needed) every template."""
+    names = template_names(app)
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
+
+
+def init_app(app):
+    app.config.setdefault('TEMPLATE_CACHE_DIR', None)
+    app.config.setdefault('TEMPLATES_PRELOAD', False)
+    directory = app.config['TEMPLATE_CACHE_DIR']
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
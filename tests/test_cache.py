@@ -0,0 +1,105 @@
+import time
+
+from cache import LRUCache
+
+
+def test_generations_are_not_evicted_by_count():
+    cache = LRUCache(max_entries=4)
+    for number in range(100):
+        cache.bump('Show:{}'.format(number))
+    # Rows that were never bumped still read as their first generation, so
+    # the fragments cached for them stay valid.
+    assert cache.generation('Show:1000') == 0
+    assert cache.generations(['Show:0', 'Show:99']) == [1, 100]
+
+
+def test_generations_are_forgotten_once_no_entry_can_use_them():
+    cache = LRUCache(max_entries=4, ttl=0.01)
+    cache.bump('Show:1')
+    bumped = cache.generation('Show:1')
+    time.sleep(0.03)
+    cache.bump('Show:2')
+    assert cache.stats()['generations'] == 1
+    assert cache.generation('Show:1') == 0
+    # A later bump never brings back a generation used before.
+    cache.bump('Show:1')
+    assert cache.generation('Show:1') > bumped
+
+
+def test_each_app_keeps_its_own_backend(settings):
+    from app import create_app
+    from cache import response_cache
+
+    first, second = create_app(settings), create_app(settings)
+    with first.app_context():
+        first_backend = response_cache.backend
+    with second.app_context():
+        assert response_cache.backend is not first_backend
+        before = first_backend.generation('Venue')
+        response_cache.invalidate('Venue')
+    assert first_backend.generation('Venue') == before
+
+
+
+def test_commits_invalidate_once_however_many_apps(settings):
+    from app import create_app
+    from models import db
+
+    app = [create_app(settings) for _ in range(3)][-1]
+    with app.app_context():
+        backend = app.extensions['response_cache']
+        before = backend.generation('Venue')
+        db.session.info['changed_models'] = {'Venue'}
+        db.session.commit()
+        assert backend.generation('Venue') == before + 1
+
+
+class CountingBackend(LRUCache):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        return super().get(key)
+
+    def get_many(self, keys):
+        self.calls += 1
+        return [super(CountingBackend, self).get(key) for key in keys]
+
+    def generation(self, name):
+        self.calls += 1
+        return super().generation(name)
+
+    def generations(self, names):
+        self.calls += 1
+        return [super(CountingBackend, self).generation(name)
+                for name in names]
+
+
+TILES = """
+{%- set tiles = fragment_batch('tile', shows, Show='id', Venue='venue_id') -%}
+{%- for show in shows -%}
+{%- cache tiles[loop.index0] %}[{{ show.name }}]{% endcache -%}
+{%- endfor -%}
+"""
+
+
+def test_a_batch_fetches_a_loops_fragments_in_two_calls(app):
+    from cache import response_cache
+
+    backend = app.extensions['response_cache'] = CountingBackend()
+    template = app.jinja_env.from_string(TILES)
+    shows = [{'id': number, 'venue_id': 1, 'name': 'show {}'.format(number)}
+             for number in range(20)]
+    with app.app_context():
+        assert template.render(shows=shows).count('[show') == 20
+        backend.calls = 0
+        shows[3]['name'] = 'renamed'
+        # Served from the cache: the rename is not seen until a commit
+        # bumps the show's version.
+        assert 'renamed' not in template.render(shows=shows)
+        assert backend.calls == 2
+        response_cache.invalidate('Show:3')
+        assert '[renamed]' in template.render(shows=shows)
@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import pytest
+from flask import flash
+
+from conditional import conditional
+
+CHANGED = datetime(2020, 6, 19, 20, 30, 15, 123456)
+
+
+@pytest.fixture
+def page(app):
+    """A conditional page whose state the test can change."""
+    page = {'state': ((1,), CHANGED), 'calls': 0}
+
+    def render(id):
+        page['calls'] += 1
+        if page['state'] is None:
+            return 'no such page', 404
+        return 'page {}'.format(id)
+
+    view = conditional(lambda id: page['state'])(render)
+    app.add_url_rule('/pages/<int:id>', 'page', view,
+                     methods=['GET', 'POST'])
+
+    @app.route('/flash')
+    def flash_and_render():
+        flash('Saved')
+        return view(id=1)
+    return page
+
+
+def test_the_first_get_carries_validators(app, page):
+    response = app.test_client().get('/pages/1')
+    assert response.data == b'page 1'
+    assert response.headers['ETag']
+    assert response.last_modified == CHANGED.replace(microsecond=0)
+    assert response.cache_control.private
+    assert response.cache_control.no_cache
+
+
+def test_a_matching_etag_answers_304_without_rendering(app, page):
+    client = app.test_client()
+    etag = client.get('/pages/1').headers['ETag']
+    response = client.get('/pages/1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert page['calls'] == 1
+
+
+def test_a_changed_state_changes_the_etag(app, page):
+    client = app.test_client()
+    etag = client.get('/pages/1').headers['ETag']
+    page['state'] = ((2,), CHANGED)
+    response = client.get('/pages/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('since, status', [
+    ('Fri, 19 Jun 2020 20:30:15 GMT', 304),
+    ('Fri, 19 Jun 2020 20:30:14 GMT', 200),
+])
+def test_if_modified_since(app, page, since, status):
+    response = app.test_client().get(
+        '/pages/1', headers={'If-Modified-Since': since})
+    assert response.status_code == status
+
+
+def test_an_etag_overrides_if_modified_since(app, page):
+    response = app.test_client().get('/pages/1', headers={
+        'If-None-Match': '"stale"',
+        'If-Modified-Since': 'Fri, 19 Jun 2020 20:30:15 GMT'})
+    assert response.status_code == 200
+
+
+def test_missing_pages_are_left_to_the_view(app, page):
+    page['state'] = None
+    response = app.test_client().get('/pages/1')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+
+def test_posts_and_pending_flashes_are_always_rendered(app, page):
+    client = app.test_client()
+    etag = client.get('/pages/1').headers['ETag']
+    response = client.post('/pages/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    response = client.get('/flash', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert page['calls'] == 3
+
+
+@pytest.mark.parametrize('url', ['/venues/99', '/artists/99'])
+def test_unknown_profiles_are_404(app, tables, url):
+    assert app.test_client().get(url).status_code == 404
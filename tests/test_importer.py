@@ -0,0 +1,135 @@
+import io
+from datetime import datetime
+
+import pytest
+
+import importer
+from importer import IMPORTS, _copy_value, import_format, read_rows
+from models import Artist, Show, Venue
+
+
+@pytest.mark.parametrize('value, field', [
+    (None, ''),
+    ('', '""'),
+    ('\\N', '"\\N"'),
+    ('say "hi", then go', '"say ""hi"", then go"'),
+    (7, '"7"'),
+    (True, '"t"'),
+    (datetime(2020, 6, 19, 20, 30), '"2020-06-19T20:30:00"'),
+    (['Jazz', 'R&B "soul"'], '"{""Jazz"",""R&B \\""soul\\""""}"'),
+])
+def test_copy_fields_only_leave_null_unquoted(value, field):
+    assert _copy_value(value) == field
+
+
+@pytest.mark.parametrize('filename, format, expected', [
+    ('venues.csv', None, 'csv'),
+    ('venues.ndjson', None, 'ndjson'),
+    ('venues.json', None, 'ndjson'),
+    ('venues', None, 'ndjson'),
+    (None, None, 'ndjson'),
+    ('venues.txt', 'csv', 'csv'),
+])
+def test_import_format(filename, format, expected):
+    assert import_format(filename, format) == expected
+
+
+def test_read_rows():
+    csv = io.StringIO('name,city\nThe Hall,SF\n')
+    assert list(read_rows(csv, 'csv')) == [
+        (1, {'name': 'The Hall', 'city': 'SF'})]
+    ndjson = io.StringIO('{"name": "a"}\n\nnot json\n[1]\n')
+    assert list(read_rows(ndjson, 'ndjson')) == [
+        (1, {'name': 'a'}), (3, None), (4, None)]
+
+
+def test_rows_are_validated_like_the_forms():
+    values, errors = IMPORTS['venues'].validate({
+        'name': 'The Hall', 'city': 'SF', 'state': 'XX', 'address': '',
+        'genres': 'Jazz; Folk', 'website_link': 'https://hall.example',
+        'facebook_link': 'https://facebook.com/thehall'})
+    assert errors == [('state', 'Not a valid choice'),
+                      ('address', 'This field is required.')]
+    assert values['genres'] == ['Jazz', 'Folk']
+    assert values['website'] == 'https://hall.example'
+
+    values, errors = IMPORTS['shows'].validate({
+        'venue_id': '1', 'artist_id': 'x',
+        'start_time': '2031-01-01 20:00:00'})
+    assert errors == [('artist_id', 'Not a valid integer value')]
+    assert values['start_time'] == datetime(2031, 1, 1, 20)
+    assert values['duration'] == 120
+
+
+@pytest.fixture
+def db(tables):
+    for model in (Venue, Artist):
+        tables.session.execute(model.__table__.insert().values(
+            id=1, name=model.__name__, upcoming_shows_count=0,
+            past_shows_count=0, version=1, updated_at=datetime.utcnow()))
+    tables.session.commit()
+    return tables
+
+
+def _shows(start, venue_id=1):
+    return {'venue_id': venue_id, 'artist_id': 1, 'start_time': start}
+
+
+def test_import_shows(db):
+    checkpoints = []
+    rows = enumerate([
+        _shows('2031-01-01 20:00:00'),
+        None,
+        _shows('2031-01-02 20:00:00', venue_id=9),
+        _shows('2031-01-03 20:00:00'),
+        _shows('2031-01-04 25:00:00'),
+        _shows('2001-01-05 20:00:00'),
+    ], start=1)
+    report = importer.import_rows(
+        'shows', rows, batch_size=2, method='insert',
+        checkpoint=checkpoints.append)
+    assert report.to_dict() == {
+        'imported': 3, 'processed': 6, 'skipped': 0, 'errors': [
+            {'row': 2, 'field': None, 'message': 'Unreadable row'},
+            {'row': 3, 'field': 'venue_id', 'message': 'No venue with id 9'},
+            {'row': 5, 'field': 'start_time',
+             'message': 'Not a valid datetime value'},
+        ]}
+    assert checkpoints[0] == 3 and checkpoints[-1] == 6
+    assert db.session.query(Show).count() == 3
+    assert db.session.query(
+        Venue.upcoming_shows_count, Venue.past_shows_count).one() == (2, 1)
+
+
+def test_a_resumed_import_skips_the_committed_rows(db):
+    rows = enumerate([_shows('2031-01-0{} 20:00:00'.format(day))
+                      for day in range(1, 5)], start=1)
+    report = importer.import_rows('shows', rows, skip=2, method='insert')
+    assert (report.imported, report.processed, report.skipped) == (2, 4, 2)
+    assert [start.day for start, in db.session.query(Show.start_time)] == [
+        3, 4]
+
+
+class ExclusionViolation(Exception):
+    pgcode = '23P01'
+
+
+def test_double_bookings_are_reported_per_row(db, monkeypatch):
+    insert_rows = importer.insert_rows
+    batches = []
+
+    def refuse_the_second_slot(table, rows, method='insert'):
+        batches.append(len(rows))
+        if any(row['start_time'].day == 2 for row in rows):
+            raise ExclusionViolation()
+        insert_rows(table, rows, method)
+    monkeypatch.setattr(importer, 'insert_rows', refuse_the_second_slot)
+
+    rows = enumerate([_shows('2031-01-0{} 20:00:00'.format(day))
+                      for day in range(1, 4)], start=1)
+    report = importer.import_rows('shows', rows, method='insert')
+    assert batches == [3, 1, 1, 1]
+    assert report.imported == 2
+    assert report.errors == [(2, 'start_time', 'Overlaps another show at '
+                                                'the venue or by the artist')]
+    assert db.session.query(Show).count() == 2
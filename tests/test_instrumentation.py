@@ -0,0 +1,29 @@
+import time
+
+import pytest
+from flask import g
+from sqlalchemy.exc import OperationalError
+
+from models import db
+
+
+def test_failed_statements_leave_nothing_on_the_connection(app):
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        connection = db.session.connection()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute('SELECT * FROM missing_table')
+        assert not connection.info.get('statement_started')
+
+
+def test_times_only_the_statements_run(app):
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        connection = db.session.connection()
+        with pytest.raises(OperationalError):
+            connection.execute('SELECT * FROM missing_table')
+        time.sleep(0.2)
+        connection.execute('SELECT 1')
+        assert g.sql_statements['SELECT 1'] == 1
+        assert g.sql_time < 0.1
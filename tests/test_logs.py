@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import queue
+import sys
+
+from logs import (
+    TEXT_FORMAT,
+    BatchedRotatingFileHandler,
+    BatchedWatchedFileHandler,
+    DroppingQueueHandler,
+    JsonFormatter
+)
+
+
+def _record(message):
+    return logging.LogRecord('test', logging.ERROR, __file__, 1, message,
+                             None, None)
+
+
+def test_records_stay_buffered_until_the_batch_is_flushed(tmp_path):
+    path = str(tmp_path / 'error.log')
+    handler = BatchedRotatingFileHandler(path, maxBytes=1024 * 1024,
+                                         backupCount=1)
+    try:
+        for number in range(50):
+            handler.handle(_record('message {}'.format(number)))
+            assert os.path.getsize(path) == 0
+        handler.flush_batch()
+        assert os.path.getsize(path) > 0
+    finally:
+        handler.close()
+
+
+def test_rolls_over_at_max_bytes(tmp_path):
+    path = str(tmp_path / 'error.log')
+    handler = BatchedRotatingFileHandler(path, maxBytes=100, backupCount=2)
+    try:
+        for number in range(10):
+            handler.handle(_record('x' * 30))
+        handler.flush_batch()
+        assert os.path.exists(path + '.1')
+        assert os.path.getsize(path) <= 100
+        assert os.path.getsize(path + '.1') <= 100
+    finally:
+        handler.close()
+
+
+class CountingFormatter(logging.Formatter):
+
+    calls = 0
+
+    def format(self, record):
+        self.calls += 1
+        return super().format(record)
+
+
+def test_formats_each_record_once(tmp_path):
+    handler = BatchedRotatingFileHandler(str(tmp_path / 'error.log'),
+                                         maxBytes=100, backupCount=2)
+    formatter = CountingFormatter()
+    handler.setFormatter(formatter)
+    try:
+        for number in range(10):
+            handler.handle(_record('x' * 30))
+    finally:
+        handler.close()
+    assert formatter.calls == 10
+
+
+def test_reopens_the_file_once_it_has_been_moved(tmp_path):
+    path = str(tmp_path / 'error.log')
+    handler = BatchedWatchedFileHandler(path)
+    try:
+        handler.handle(_record('before'))
+        handler.flush_batch()
+        os.rename(path, path + '.1')
+        handler.handle(_record('after'))
+        handler.flush_batch()
+        handler.handle(_record('reopened'))
+        handler.flush_batch()
+    finally:
+        handler.close()
+    with open(path + '.1') as f:
+        assert f.read() == 'before\nafter\n'
+    with open(path) as f:
+        assert f.read() == 'reopened\n'
+
+
+def _queued(record):
+    # What the listener thread receives for a record logged on a request
+    # thread.
+    log_queue = queue.Queue()
+    DroppingQueueHandler(log_queue).handle(record)
+    return log_queue.get_nowait()
+
+
+def _failed():
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        return logging.LogRecord('test', logging.ERROR, __file__, 1,
+                                 'failed %s', ('here',), sys.exc_info())
+
+
+def test_json_log_keeps_the_exception_apart():
+    entry = json.loads(JsonFormatter().format(_queued(_failed())))
+    assert entry['message'] == 'failed here'
+    assert 'ValueError: boom' in entry['exception']
+
+
+def test_text_log_keeps_the_traceback():
+    line = logging.Formatter(TEXT_FORMAT).format(_queued(_failed()))
+    assert 'failed here' in line
+    assert line.endswith('ValueError: boom')
@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_metrics_are_off_by_default(app, client):
+    assert client.get('/_metrics').status_code == 404
+
+
+def test_metrics_when_enabled(app, client):
+    app.config['METRICS_ENABLED'] = True
+    response = client.get('/_metrics')
+    assert response.status_code == 200
+    assert 'response_cache' in response.get_json()
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from models import (
+    Artist,
+    Show,
+    Venue,
+    is_booking_conflict,
+    refresh_show_counters
+)
+
+
+@pytest.fixture
+def db(tables):
+    for model in (Venue, Artist):
+        for id in (1, 2):
+            tables.session.execute(model.__table__.insert().values(
+                id=id, name='{} {}'.format(model.__name__, id),
+                upcoming_shows_count=0, past_shows_count=0, version=1,
+                updated_at=datetime.utcnow()))
+    tables.session.commit()
+    return tables
+
+
+def _counts(db, model, id):
+    return db.session.query(
+        model.upcoming_shows_count, model.past_shows_count
+    ).filter(model.id == id).one()
+
+
+def _book(db, days, venue_id=1, artist_id=1):
+    show = Show(venue_id=venue_id, artist_id=artist_id,
+                start_time=datetime.now() + timedelta(days=days))
+    db.session.add(show)
+    db.session.commit()
+    return show
+
+
+def test_new_shows_are_counted_as_upcoming_or_past(db):
+    _book(db, 2)
+    _book(db, 3)
+    _book(db, -2)
+    assert _counts(db, Venue, 1) == (2, 1)
+    assert _counts(db, Artist, 1) == (2, 1)
+    assert _counts(db, Venue, 2) == (0, 0)
+
+
+def test_moving_a_show_recounts_both_ends(db):
+    show = _book(db, 2)
+    show.venue_id = 2
+    show.start_time = datetime.now() - timedelta(days=1)
+    db.session.commit()
+    assert _counts(db, Venue, 1) == (0, 0)
+    assert _counts(db, Venue, 2) == (0, 1)
+    assert _counts(db, Artist, 1) == (0, 1)
+
+
+def test_deleting_a_show_uncounts_it(db):
+    show = _book(db, 2)
+    _book(db, -2)
+    db.session.delete(show)
+    db.session.commit()
+    assert _counts(db, Venue, 1) == (0, 1)
+    assert _counts(db, Artist, 1) == (0, 1)
+
+
+def test_counter_updates_bump_the_profile_version(db):
+    # The profile pages' ETags depend on it.
+    versions = db.session.query(Venue.version).filter(Venue.id == 1)
+    before = versions.scalar()
+    _book(db, 2)
+    assert versions.scalar() == before + 1
+
+
+def test_refresh_rolls_started_shows_over_to_past(db):
+    _book(db, 2)
+    # Written behind the listeners' back, as time passing would.
+    db.session.execute(Show.__table__.update().values(
+        start_time=datetime.now() - timedelta(minutes=5)))
+    db.session.commit()
+    assert _counts(db, Venue, 1) == (1, 0)
+
+    refresh_show_counters(since=datetime.now() - timedelta(hours=1))
+    assert _counts(db, Venue, 1) == (0, 1)
+    assert _counts(db, Artist, 1) == (0, 1)
+
+
+class ExclusionViolation(Exception):
+    pgcode = '23P01'
+
+
+class UniqueViolation(Exception):
+    pgcode = '23505'
+
+
+def test_only_exclusion_violations_are_booking_conflicts():
+    assert is_booking_conflict(ExclusionViolation())
+    assert is_booking_conflict(
+        IntegrityError('INSERT', {}, ExclusionViolation()))
+    assert not is_booking_conflict(UniqueViolation())
+    assert not is_booking_conflict(ValueError())
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from models import PROFILE_SHOWS_CURSOR
+from pagination import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize('values', [
+    [],
+    [1],
+    [datetime(2020, 6, 19, 20), 1, 2],
+    [1, 1],
+    ['2020-06-19T20:00:00', 1],
+    [datetime(2020, 6, 19, 20), '1'],
+    [datetime(2020, 6, 19, 20), True],
+    [datetime(2020, 6, 19, 20), [1]],
+    [datetime(2020, 6, 19, 20), None],
+])
+def test_past_shows_cursor_must_fit(app, values):
+    with app.test_request_context():
+        with pytest.raises(BadRequest):
+            decode_cursor(encode_cursor(values), PROFILE_SHOWS_CURSOR)
+
+
+def test_past_shows_cursor_round_trips(app):
+    values = [datetime(2020, 6, 19, 20), 7]
+    with app.test_request_context():
+        assert decode_cursor(
+            encode_cursor(values), PROFILE_SHOWS_CURSOR) == values
+
+
+@pytest.mark.parametrize('url', ['/shows', '/venues', '/artists'])
+@pytest.mark.parametrize('values', [[], [1], ['x', 'y', 'z', 'w', 'v']])
+def test_list_cursor_must_fit_the_sort_key(app, url, values):
+    cursor = encode_cursor(values)
+    client = app.test_client()
+    assert client.get(url, query_string={'after': cursor}).status_code == 400
+    assert client.get(url, query_string={'before': cursor}).status_code == 400
@@ -0,0 +1,131 @@
+"""The main view queries must be planned as index scans.
+
+Each page below is requested while the SQL it runs is recorded, and every
+recorded SELECT is run again under ``EXPLAIN (FORMAT JSON)`` with the
+planner's default settings, on the medium benchmark dataset. A Seq Scan
+on a checked table means the planner no longer picks an index for it,
+whether because an index is missing or because the query stopped fitting
+one.
+
+Opt-in: set BENCH_DATABASE_URL to a scratch Postgres database migrated to
+head. Its tables are truncated and seeded first.
+
+    BENCH_DATABASE_URL=postgresql://localhost/fyyur_bench \\
+        python -m pytest tests/test_query_plans.py
+"""
+import json
+import os
+from urllib.parse import quote_plus
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get('BENCH_DATABASE_URL'),
+    reason='set BENCH_DATABASE_URL to a scratch Postgres database')
+
+# (url, tables that must not be read with a sequential scan). {venue} and
+# {artist} are replaced with the venue and artist that have the most shows,
+# {city} with that venue's city.
+CHECKS = [
+    ('/venues', {'Venue'}),
+    ('/venues/{venue}', {'Venue', 'Show'}),
+    ('/venues/{venue}/past-shows', {'Venue', 'Show'}),
+    ('/artists', {'Artist'}),
+    ('/artists/{artist}', {'Artist', 'Show'}),
+    ('/artists/{artist}/past-shows', {'Artist', 'Show'}),
+    ('/shows', {'Show'}),
+    ('/shows?city={city}&from=2026-01-01&to=2026-01-07', {'Show', 'Venue'}),
+    ('/shows/calendar.json?from=2026-01-01', {'Show'}),
+]
+
+
+@pytest.fixture(scope='module')
+def settings(settings):
+    settings.SQLALCHEMY_DATABASE_URI = os.environ['BENCH_DATABASE_URL']
+    settings.RESPONSE_CACHE_ENABLED = False
+    settings.FRAGMENT_CACHE_ENABLED = False
+    return settings
+
+
+@pytest.fixture(scope='module')
+def app(settings):
+    from app import create_app
+    from benchmarks.routes import seed_database
+    from models import db
+
+    app = create_app(settings)
+    seed_database(app, 'medium')
+    with app.app_context():
+        db.session.execute('ANALYZE')
+        db.session.commit()
+    return app
+
+
+@pytest.fixture(scope='module')
+def ids(app):
+    from benchmarks.routes import _busiest
+    from models import Artist, Venue
+
+    with app.app_context():
+        venue_id = _busiest(Venue, Venue.past_shows_count)
+        return {
+            'venue': venue_id,
+            'artist': _busiest(Artist, Artist.past_shows_count),
+            'city': quote_plus(Venue.query.get(venue_id).city),
+        }
+
+
+def _seq_scans(plan):
+    if plan['Node Type'] == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', ()):
+        yield from _seq_scans(child)
+
+
+def _statements(client, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context,
+                              executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(Engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+    return statements
+
+
+def _plan(connection, statement, parameters):
+    cursor = connection.cursor()
+    try:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+        plan = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+@pytest.mark.parametrize('url, tables', CHECKS)
+def test_view_queries_use_indexes(app, ids, url, tables):
+    from models import db
+
+    statements = _statements(app.test_client(), url.format(**ids))
+    assert statements
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            for statement, parameters in statements:
+                scanned = set(_seq_scans(
+                    _plan(connection, statement, parameters))) & tables
+                assert not scanned, statement
+        finally:
+            connection.rollback()
+            connection.close()
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+from flask import session
+
+from cache import response_cache
+from models import db, Venue
+
+# Two in-memory SQLite engines stand in for the primary and a replica;
+# nothing below needs their tables except the bulk delete, which creates
+# its own.
+
+
+@pytest.fixture
+def settings(settings):
+    settings.SQLALCHEMY_BINDS = {'replica_1': 'sqlite://'}
+    settings.SQLALCHEMY_REPLICA_BINDS = ['replica_1']
+    return settings
+
+
+def _bind():
+    return db.session.get_bind(Venue.__mapper__)
+
+
+def _engines(app):
+    return db.get_engine(app), db.get_engine(app, bind='replica_1')
+
+
+def test_reads_go_to_the_replica(app):
+    primary, replica = _engines(app)
+    with app.test_request_context('/venues'):
+        assert _bind() is replica
+    # search_venues is a POST marked @read_only.
+    with app.test_request_context('/venues/search', method='POST'):
+        assert _bind() is replica
+
+
+def test_writes_go_to_the_primary(app):
+    primary, _ = _engines(app)
+    with app.test_request_context('/venues/create', method='POST'):
+        assert _bind() is primary
+    with app.app_context():
+        assert _bind() is primary
+
+
+def test_bulk_delete_sticks_to_the_primary(app):
+    primary, replica = _engines(app)
+    with app.test_request_context('/venues/1', method='DELETE'):
+        db.session.execute(
+            'CREATE TABLE "Venue" (id INTEGER PRIMARY KEY)', bind=primary)
+        Venue.query.filter_by(id=1).delete()
+        db.session.commit()
+        until = session['db_primary_until']
+    assert until > time.time()
+
+    # The next request carries the deadline back in the session cookie.
+    with app.test_request_context('/venues'):
+        session['db_primary_until'] = until
+        assert _bind() is primary
+    with app.test_request_context('/venues'):
+        session['db_primary_until'] = time.time() - 1
+        assert _bind() is replica
+
+
+def test_cached_pages_are_read_from_the_primary(app):
+    primary, replica = _engines(app)
+    binds = []
+
+    @response_cache.cached(Venue)
+    def probe():
+        binds.append(_bind())
+        return 'probe'
+    app.add_url_rule('/probe', 'probe', probe)
+
+    with app.test_request_context('/probe'):
+        assert _bind() is replica
+        probe()
+    assert binds == [primary]
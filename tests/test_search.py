@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy.dialects.postgresql import psycopg2
+
+from models import Artist, Venue, search_query
+
+
+def _pyformat(statement):
+    # What psycopg2 does with a statement and its parameters before
+    # sending it: %-format the SQL with the quoted values.
+    compiled = statement.compile(dialect=psycopg2.dialect())
+    return compiled.string % {
+        name: repr(value) for name, value in compiled.params.items()}
+
+
+@pytest.mark.parametrize('model', [Venue, Artist])
+@pytest.mark.parametrize('term', ['', 'blue', 'Blu Rom', '100%', 'a_b'])
+def test_search_query_survives_pyformat(app, model, term):
+    with app.app_context():
+        sql = _pyformat(search_query(model, term, 10).statement)
+    if term:
+        assert '.name % ' in sql
@@ -0,0 +1,134 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import BadRequest
+
+import shows
+from cache import response_cache
+from models import Show
+
+
+@pytest.mark.parametrize('query, start', [
+    ('', None),
+    ('from=2020-06-19', datetime(2020, 6, 19)),
+    ('from=2020-06-19T20:30', datetime(2020, 6, 19, 20, 30)),
+])
+def test_date_arg(app, query, start):
+    with app.test_request_context('/shows?' + query):
+        assert shows._date_arg('from') == start
+
+
+@pytest.mark.parametrize('query, end', [
+    ('', None),
+    ('to=2020-06-21', datetime(2020, 6, 22)),
+    ('to=2020-06-21T23:00', datetime(2020, 6, 21, 23)),
+])
+def test_a_bare_end_date_includes_the_whole_day(app, query, end):
+    with app.test_request_context('/shows?' + query):
+        assert shows._end_arg('to') == end
+
+
+@pytest.mark.parametrize('value', [
+    'tomorrow', '2020-13-01', '2020-06-19T20:30+02:00', '2020-06-19T20:30Z'])
+def test_bad_and_offset_aware_dates_are_rejected(app, value):
+    with app.test_request_context('/shows', query_string={'from': value}):
+        with pytest.raises(BadRequest):
+            shows._date_arg('from')
+
+
+class Tomorrow(date):
+
+    @classmethod
+    def today(cls):
+        return date(2031, 1, 2)
+
+
+def test_the_default_calendar_window_is_part_of_the_cache_key(
+        app, monkeypatch):
+    @response_cache.cached(Show, vary=shows._calendar_window)
+    def probe():
+        return str(shows._calendar_window()[0])
+    app.add_url_rule('/probe', 'probe', probe)
+    client = app.test_client()
+
+    first = client.get('/probe')
+    assert client.get('/probe').headers['X-Cache'] == 'HIT'
+    monkeypatch.setattr(shows, 'date', Tomorrow)
+    after_midnight = client.get('/probe')
+    assert after_midnight.headers['X-Cache'] == 'MISS'
+    assert after_midnight.data == b'2031-01-02 00:00:00'
+    assert first.data != after_midnight.data
+
+
+BOOKING = {'venue_id': '1', 'artist_id': '1',
+           'start_time': '2031-01-01 20:00:00', 'duration': '90'}
+BOOKED = SimpleNamespace(venue_id=1, artist_id=2, duration=120,
+                         start_time=datetime(2031, 1, 1, 19))
+
+
+class DatabaseError(Exception):
+
+    def __init__(self, pgcode):
+        self.pgcode = pgcode
+
+
+@pytest.fixture
+def refuse_shows(tables):
+    """Make the database refuse new shows with the given error code."""
+    codes = []
+
+    def refuse(mapper, connection, target):
+        if codes:
+            raise IntegrityError('INSERT', {}, DatabaseError(codes[0]))
+    event.listen(Show, 'before_insert', refuse)
+    yield codes.append
+    event.remove(Show, 'before_insert', refuse)
+
+
+def _shows(tables):
+    return tables.session.query(Show).count()
+
+
+@pytest.mark.parametrize('conflict, message', [
+    (BOOKED, b'Venue 1 is already booked from 2031-01-01 19:00 to 21:00'),
+    (SimpleNamespace(**dict(vars(BOOKED), venue_id=2, artist_id=1)),
+     b'Artist 1 is already playing from 2031-01-01 19:00 to 21:00'),
+])
+def test_a_double_booking_is_refused_with_409(
+        app, tables, monkeypatch, conflict, message):
+    monkeypatch.setattr(shows, 'booking_conflict', lambda **_: conflict)
+    response = app.test_client().post('/shows/create', data=BOOKING)
+    assert response.status_code == 409
+    assert message in response.data
+    assert _shows(tables) == 0
+
+
+def test_a_free_slot_is_booked(app, tables, monkeypatch):
+    monkeypatch.setattr(shows, 'booking_conflict', lambda **_: None)
+    response = app.test_client().post('/shows/create', data=BOOKING)
+    assert response.status_code == 200
+    assert _shows(tables) == 1
+
+
+def test_a_booking_that_loses_a_race_is_refused_with_409(
+        app, tables, refuse_shows, monkeypatch):
+    # Free when checked, taken by the time the insert reaches the database.
+    found = [None, BOOKED]
+    monkeypatch.setattr(shows, 'booking_conflict', lambda **_: found.pop(0))
+    refuse_shows('23P01')
+    response = app.test_client().post('/shows/create', data=BOOKING)
+    assert response.status_code == 409
+    assert b'Venue 1 is already booked' in response.data
+    assert found == []
+    assert _shows(tables) == 0
+
+
+def test_other_integrity_errors_are_not_booking_conflicts(
+        app, tables, refuse_shows, monkeypatch):
+    monkeypatch.setattr(shows, 'booking_conflict', lambda **_: None)
+    refuse_shows('23503')
+    with pytest.raises(IntegrityError):
+        app.test_client().post('/shows/create', data=BOOKING)
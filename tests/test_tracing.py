@@ -0,0 +1,40 @@
+import json
+import multiprocessing
+import time
+
+from tracing import TraceWriter
+
+WORKERS = 4
+RECORDS = 2000
+
+
+def _worker(path, number):
+    writer = TraceWriter(path)
+    writer.start()
+    for sequence in range(RECORDS):
+        writer.write({'worker': number, 'sequence': sequence,
+                      'padding': 'x' * 500})
+        if sequence % 10 == 0:
+            # Let the writer thread take small batches, as it does under
+            # real traffic, rather than one batch of everything.
+            time.sleep(0.001)
+    writer.close()
+
+
+def test_workers_never_split_each_others_lines(tmp_path):
+    path = str(tmp_path / 'requests.jsonl')
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_worker, args=(path, number))
+               for number in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    seen = {number: [] for number in range(WORKERS)}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            seen[record['worker']].append(record['sequence'])
+    assert seen == {number: list(range(RECORDS)) for number in range(WORKERS)}
@@ -0,0 +1,167 @@
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, g, request
+from flask.signals import before_render_template, template_rendered
+
+# ----------------------------------------------------------------------------#
+# Per-request timing trace.
+# ----------------------------------------------------------------------------#
+
+# Every sampled request is appended as one JSON line to REQUEST_TRACE_PATH
+# with its route, status, total/SQL/template time, statement count and
+# response size. Requests only enqueue the line; a background thread writes
+# the lines queued meanwhile in one batch, and when the queue is full lines
+# are dropped (and counted) rather than making the request wait. Every
+# response also gets a Server-Timing header with the same timings.
+#
+# Every gunicorn worker appends to the same file. Each batch goes out as
+# whole lines in a single write() on an O_APPEND descriptor, so batches
+# from different workers never split or interleave each other's lines.
+
+
+class TraceWriter:
+
+    def __init__(self, path, queue_size=10000, batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='trace-writer', daemon=True)
+                self._thread.start()
+
+    def restart(self):
+        # After fork the child has this object but not the thread, and the
+        # queue's locks may have been held mid-operation; start over.
+        self._queue = queue.Queue(self._queue.maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.start()
+
+    def write(self, record):
+        try:
+            self._queue.put_nowait(json.dumps(record))
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first):
+        lines = [first]
+        while len(lines) < self.batch_size:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return lines
+
+    def _run(self):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    break
+                lines = self._drain(first)
+                stop = lines[-1] is None
+                if stop:
+                    lines.pop()
+                if lines:
+                    os.write(fd, ('\n'.join(lines) + '\n').encode('utf-8'))
+                    self.written += len(lines)
+                if stop:
+                    break
+        finally:
+            os.close(fd)
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def stats(self):
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'queued': self._queue.qsize(),
+        }
+
+
+def _start_trace():
+    g.trace_started = time.perf_counter()
+    g.template_time = 0.0
+
+
+def _template_started(app, template, context):
+    g.template_started = time.perf_counter()
+
+
+def _template_finished(app, template, context):
+    started = g.pop('template_started', None)
+    if started is not None:
+        g.template_time += time.perf_counter() - started
+
+
+def _finish_trace(response):
+    started = g.get('trace_started')
+    if started is None:
+        return response
+    app = current_app._get_current_object()
+    total = time.perf_counter() - started
+    sql_time = g.get('sql_time', 0.0)
+    sql_count = sum(g.get('sql_statements', {}).values())
+    template_time = g.get('template_time', 0.0)
+
+    if app.config['SERVER_TIMING_HEADER']:
+        response.headers['Server-Timing'] = (
+            'app;dur={:.2f}, db;dur={:.2f};desc="{} queries", '
+            'tpl;dur={:.2f}'.format(total * 1000, sql_time * 1000,
+                                    sql_count, template_time * 1000))
+
+    writer = app.extensions.get('trace_writer')
+    if writer is not None and \
+            random.random() < app.config['REQUEST_TRACE_SAMPLE_RATE']:
+        writer.write({
+            'time': datetime.utcnow().isoformat(),
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule else None,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'sql_ms': round(sql_time * 1000, 3),
+            'sql_count': sql_count,
+            'template_ms': round(template_time * 1000, 3),
+            'bytes': response.calculate_content_length(),
+        })
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('REQUEST_TRACE_PATH', 'requests.jsonl')
+    app.config.setdefault('REQUEST_TRACE_SAMPLE_RATE', 1.0)
+    app.config.setdefault('REQUEST_TRACE_QUEUE_SIZE', 10000)
+    app.config.setdefault('SERVER_TIMING_HEADER', True)
+    if app.config['REQUEST_TRACE_PATH'] and \
+            app.config['REQUEST_TRACE_SAMPLE_RATE'] > 0:
+        writer = TraceWriter(app.config['REQUEST_TRACE_PATH'],
+                             app.config['REQUEST_TRACE_QUEUE_SIZE'])
+        writer.start()
+        atexit.register(writer.close)
+        os.register_at_fork(after_in_child=writer.restart)
+        app.extensions['trace_writer'] = writer
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    app.before_request(_start_trace)
+    app.after_request(_finish_trace)
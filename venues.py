@@ -0,0 +1,236 @@
+from itertools import groupby
+from operator import itemgetter
+
+from flask import (
+    Blueprint,
+    current_app,
+    flash,
+    redirect,
+    render_template,
+    request,
+    url_for
+)
+
+from cache import response_cache
+from conditional import conditional
+from forms import VenueForm
+from instrumentation import query_budget
+from models import (
+    PROFILE_SHOWS_CURSOR,
+    db,
+    Show,
+    Venue,
+    profile_shows,
+    profile_state,
+    search
+)
+from pagination import decode_cursor, keyset_paginate, more_cursor, page_args
+from routing import read_only
+
+bp = Blueprint('venues', __name__)
+
+
+@bp.route('/venues')
+@query_budget(1)
+@response_cache.cached(Venue, Show)
+def venues():
+    # One page of the venue table, ordered by area so the rows can be
+    # folded into areas in a single pass; upcoming show counts are read from
+    # the denormalized counter instead of aggregating the Show table.
+    after, before, per_page = page_args()
+    query = db.session.query(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        Venue.upcoming_shows_count
+    )
+    page = keyset_paginate(
+        query,
+        [Venue.city, Venue.state, Venue.name, Venue.id],
+        key=lambda row: (row.city, row.state, row.name, row.id),
+        after=after, before=before, per_page=per_page)
+
+    data = []
+    for (city, state), group in groupby(page.items, key=lambda row: row[:2]):
+        data.append({
+            "city": city,
+            "state": state,
+            "venues": [{
+                "id": venue_id,
+                "name": name,
+                "num_upcoming_shows": num_upcoming_shows
+            } for _, _, venue_id, name, num_upcoming_shows in group]
+        })
+    return render_template('pages/venues.html', areas=data, page=page)
+
+@bp.route('/venues/search', methods=['POST'])
+@query_budget(1)
+@read_only
+def search_venues():
+    search_term = request.form.get('search_term', '')
+    results = search(Venue, search_term, current_app.config['SEARCH_LIMIT'])
+
+    data = []
+    for v, _ in results:
+        data.append({
+            "id": v.id,
+            "name": v.name,
+            "num_upcoming_shows": v.upcoming_shows_count
+        })
+
+    response = {
+        "count": results[0].total if results else 0,
+        "data": data
+    }
+    return render_template(
+        'pages/search_venues.html',
+        results=response,
+        search_term=search_term)
+
+
+@bp.route('/venues/<int:venue_id>')
+@query_budget(3)
+@conditional(lambda venue_id: profile_state(Venue, venue_id))
+def show_venue(venue_id):
+    data = Venue.query.get_or_404(venue_id).format()
+    shows = profile_shows(
+        Venue, venue_id, current_app.config['PROFILE_SHOWS_LIMIT'])
+    data['upcoming_shows'], data['upcoming_shows_count'] = shows['upcoming']
+    data['past_shows'], data['past_shows_count'] = shows['past']
+    data['past_shows_cursor'] = more_cursor(
+        *shows['past'], key=itemgetter('start_time', 'id'))
+    return render_template('pages/show_venue.html', venue=data)
+
+
+@bp.route('/venues/<int:venue_id>/past-shows')
+@query_budget(3)
+@conditional(lambda venue_id: profile_state(Venue, venue_id))
+def venue_past_shows(venue_id):
+    # "Load more" for the profile page: the next past shows, older than
+    # the ?before= cursor.
+    venue = Venue.query.get_or_404(venue_id)
+    before = request.args.get('before')
+    shows, remaining = profile_shows(
+        Venue, venue_id, current_app.config['PROFILE_SHOWS_LIMIT'],
+        before=decode_cursor(before, PROFILE_SHOWS_CURSOR)
+        if before else None)['past']
+    cursor = more_cursor(
+        shows, remaining, key=itemgetter('start_time', 'id'))
+    return render_template(
+        'pages/past_shows.html', name=venue.name,
+        profile_url=url_for('venues.show_venue', venue_id=venue_id),
+        shows=shows, other='artist',
+        more_url=cursor and url_for(
+            'venues.venue_past_shows', venue_id=venue_id,
+            before=cursor))
+
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    form = VenueForm(request.form, meta={'csrf': False})
+    if form.validate():
+        try:
+            venue = Venue(
+                name = form.name.data,
+                city = form.city.data,
+                state = form.state.data,
+                address = form.address.data,
+                phone = form.phone.data,
+                image_link = form.image_link.data,
+                facebook_link = form.facebook_link.data,
+                genres = form.genres.data,
+                website = form.website_link.data,
+                seeking_talent = form.seeking_talent.data,
+                seeking_description = form.seeking_description.data
+            )
+            db.session.add(venue)
+            db.session.commit()
+        except ValueError as e:
+            print(e)
+            db.session.rollback()
+        finally:
+            db.session.close()
+        flash('Venue ' + request.form['name'] +
+                ' was successfully listed!') 
+        return render_template('pages/home.html')
+    else:
+        message = []
+        for field, errors in form.errors.items():
+            for error in errors:
+                message.append(f"{field}: {error}")
+        flash('Please fix the following errors: ' + ", ".join(message))
+        form = VenueForm()
+        return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    error = False
+    venue = Venue.query.get(venue_id)
+    try:
+        Venue.query.filter_by(id=venue_id).delete()
+        db.session.commit()
+    except BaseException:
+        error = True
+        db.session.rollback()
+    finally:
+        db.session.close()
+        if error:
+            flash('An error occured. Venue ' +
+                  venue.name + ' could not be deleted!')
+        else:
+            flash('Venue ' + venue.name +
+                  ' was successfully deleted!')
+    return None
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@query_budget(1)
+def edit_venue(venue_id):
+    form = VenueForm()
+    venue = Venue.query.filter(Venue.id == venue_id).one_or_none().format()
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    venue = Venue.query.filter(Venue.id == venue_id).one_or_none()
+    form = VenueForm(request.form, meta={'csrf': False})
+    if form.validate():
+        try:
+            venue.name = form.name.data
+            venue.city = form.city.data
+            venue.state = form.state.data
+            venue.address = form.address.data
+            venue.phone = form.phone.data
+            venue.image_link = form.image_link.data
+            venue.facebook_link = form.facebook_link.data
+            venue.genres = form.genres.data
+            venue.website = form.website_link.data
+            venue.seeking_talent = form.seeking_talent.data
+            venue.seeking_description = form.seeking_description.data
+            db.session.add(venue)
+            db.session.commit()
+        except ValueError as e:
+            print(e)
+            db.session.rollback()
+        finally:
+            db.session.close()
+        flash('Venue ' + request.form['name'] +
+                ' was successfully updated!') 
+        return redirect(url_for('venues.show_venue', venue_id=venue_id))
+    else:
+        message = []
+        for field, errors in form.errors.items():
+            for error in errors:
+                message.append(f"{field}: {error}")
+        flash('Please fix the following errors: ' + ", ".join(message))
+        form = VenueForm()
+        return render_template('forms/edit_venue.html', form=form, venue=venue)